@@ -1,5 +1,6 @@
 import json
 import time
+import threading
 import streamlit as st
 
 from streamlit_plotly_events import plotly_events
@@ -10,6 +11,10 @@ import numpy as np
 import utils.app_utils as au
 import utils.plots as pt
 import utils.db as db
+from utils.catalog import CatalogCache
+
+## Seconds between incremental catalog refreshes.
+CATALOG_REFRESH_SECONDS = 600
 
 ## Page config.
 st.set_page_config(
@@ -72,31 +77,7 @@ st.markdown(
 )
 
 
-def combine_input_data():
-    arxiv_df = db.load_arxiv()
-    summaries_df = db.load_summaries()
-    topics_df = db.load_topics()
-    citations_df = db.load_citations()
-    recursive_summaries_df = db.load_recursive_summaries()
-    bullet_list_df = db.load_bullet_list_summaries()
-    markdown_summaries = db.load_summary_markdown()
-    tweets = db.load_tweet_insights()
-    similar_docs_df = db.load_similar_documents()
-    # extended_summaries_dict = (
-    #     extended_summaries_df.groupby("arxiv_code")[["level", "summary"]]
-    #     .apply(lambda g: dict(zip(g["level"], g["summary"])))
-    #     .to_dict()
-    # )
-
-    papers_df = summaries_df.join(arxiv_df, how="left")
-    papers_df = papers_df.join(topics_df, how="left")
-    papers_df = papers_df.join(citations_df, how="left")
-    papers_df = papers_df.join(recursive_summaries_df, how="left")
-    papers_df = papers_df.join(bullet_list_df, how="left")
-    papers_df = papers_df.join(markdown_summaries, how="left")
-    papers_df = papers_df.join(tweets, how="left")
-    papers_df = papers_df.join(similar_docs_df, how="left")
-    # papers_df["extended_summaries"] = papers_df.index.map(extended_summaries_dict)
+def combine_input_data(papers_df: pd.DataFrame) -> pd.DataFrame:
     papers_df["arxiv_code"] = papers_df.index
     papers_df["url"] = papers_df["arxiv_code"].map(
         lambda l: f"https://arxiv.org/abs/{l}"
@@ -122,10 +103,9 @@ def prepare_calendar_data(df: pd.DataFrame, year: int) -> pd.DataFrame:
     return df_year
 
 
-@st.cache_data
-def load_data():
-    """Load data from compiled dataframe."""
-    result_df = combine_input_data()
+def prepare_input_data(catalog_df: pd.DataFrame) -> pd.DataFrame:
+    """Format catalog rows for display."""
+    result_df = combine_input_data(catalog_df)
 
     ## Remapping with emotion.
     classification_map = {
@@ -150,6 +130,28 @@ def load_data():
     return result_df
 
 
+@st.cache_resource
+def get_catalog() -> CatalogCache:
+    """Process-wide catalog, refreshed incrementally in the background."""
+    catalog = CatalogCache(prepare_fn=prepare_input_data)
+    catalog.start(interval=CATALOG_REFRESH_SECONDS)
+    return catalog
+
+
+@st.cache_resource
+def warm_up_retrieval():
+    """Build GPT Maestro's retrieval components once per process, in the
+    background (see `au.build_times` for construction timings)."""
+    thread = threading.Thread(target=au.warm_up_retrieval, daemon=True)
+    thread.start()
+    return thread
+
+
+def load_data():
+    """Load data from compiled dataframe."""
+    return get_catalog().get()
+
+
 @st.cache_data
 def get_weekly_summary(date: str):
     return db.get_weekly_summary(date)
@@ -333,9 +335,13 @@ def create_paper_card(paper: Dict, mode="closed", name=""):
             key=f"chat_{paper_code}{name}",
         )
         if st.button("Send", key=f"send_{paper_code}{name}"):
-            response = au.interrogate_paper(paper_question, paper_code)
+            timings = {}
+            chunks = au.time_stream(
+                au.interrogate_paper(paper_question, paper_code, stream=True), timings
+            )
+            response = st.write_stream(chunks)
+            print(f"Interrogate [{paper_code}] timings: {timings}")
             db.log_qna_db(f"[{paper_code}] ::: {paper_question}", response)
-            st.write(response)
 
     with st.expander("🌟 **GPT Assessments**", expanded=False):
         assessment_cols = st.columns((1, 3, 1, 3, 1, 3))
@@ -543,6 +549,7 @@ def main():
     ## Main content.
     full_papers_df = load_data()
     st.session_state["papers"] = full_papers_df
+    warm_up_retrieval()
 
     ## Filter sidebar.
     st.sidebar.markdown("# 📁 Filters")
@@ -839,23 +846,26 @@ def main():
         response_length = "Short Answer"
         if chat_btn:
             if user_question != "":
+                timings = {}
                 with st.spinner(
                     "Consulting the GPT maestro, this might take a minute..."
                 ):
-                    response, referenced_codes = au.query_llmpedia_new(
+                    chunks = au.query_llmpedia_stream(
                         user_question,
                         response_length,  # , collection_name, model="claude-haiku"
+                        timings,
                     )
-                    db.log_qna_db(user_question, response)
+                st.divider()
+                ## Render tokens as they arrive.
+                response = st.write_stream(chunks)
+                print(f"GPT Maestro timings: {timings}")
+                db.log_qna_db(user_question, response)
+                referenced_codes = au.extract_arxiv_codes(response)
+                if len(referenced_codes) > 0:
                     st.divider()
-                    st.markdown(response)
-                    if len(referenced_codes) > 0:
-                        st.divider()
-                        st.markdown(
-                            "<h4>Referenced Papers:</h4>", unsafe_allow_html=True
-                        )
-                        reference_df = st.session_state["papers"].loc[referenced_codes]
-                        generate_grid_gallery(reference_df, n_cols=5, extra_key="_chat")
+                    st.markdown("<h4>Referenced Papers:</h4>", unsafe_allow_html=True)
+                    reference_df = st.session_state["papers"].loc[referenced_codes]
+                    generate_grid_gallery(reference_df, n_cols=5, extra_key="_chat")
 
     with content_tabs[4]:
         weekly_plot_container = st.empty()
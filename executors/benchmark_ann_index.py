@@ -0,0 +1,87 @@
+import argparse
+import tempfile
+import time
+import os, sys
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.environ.get("PROJECT_PATH"))
+os.chdir(os.environ.get("PROJECT_PATH"))
+
+import utils.ann_index as ann
+
+
+def synthetic_vectors(n: int, dim: int, n_topics: int = 100, seed: int = 42):
+    """Clustered unit vectors, shaped like abstract embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_topics, dim))
+    vectors = centers[rng.integers(0, n_topics, n)] + 0.5 * rng.standard_normal((n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [f"{i:07d}" for i in range(n)], vectors.astype(np.float32)
+
+
+def exact_search(vectors, norms, codes, query, k: int) -> list:
+    dists = norms - 2 * (vectors @ query)
+    top = np.argpartition(dists, k - 1)[:k]
+    return [codes[i] for i in top[np.argsort(dists[top])]]
+
+
+def main(collection_name: str, n: int, dim: int, n_queries: int, k: int, nprobes: list):
+    if n:
+        codes, vectors = synthetic_vectors(n, dim)
+    else:
+        codes, vectors = ann.fetch_embeddings(collection_name)
+    print(f"Indexing {len(codes)} vectors (dim={vectors.shape[1]})...")
+
+    start = time.perf_counter()
+    index = ann.IVFIndex.build(codes, vectors)
+    build_time = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as index_dir:
+        path = ann.publish_index(index, collection_name, index_dir)
+        index = ann.IVFIndex.load(path)
+        print(f"Build: {build_time:.1f} s ({len(index.centroids)} lists, memory-mapped)")
+
+        ## Queries: perturbed corpus vectors (questions land near their papers).
+        rng = np.random.default_rng(0)
+        queries = vectors[rng.choice(len(vectors), n_queries)]
+        queries = queries + 0.3 * rng.standard_normal(queries.shape) / np.sqrt(dim)
+        norms = (vectors**2).sum(axis=1)
+        truth = [exact_search(vectors, norms, codes, q, k) for q in queries]
+
+        exact_times = []
+        for q in queries[:20]:
+            start = time.perf_counter()
+            exact_search(vectors, norms, codes, q, k)
+            exact_times.append(time.perf_counter() - start)
+        print(f"Exact scan: p50 {np.median(exact_times) * 1000:7.2f} ms")
+
+        for nprobe in nprobes:
+            times, recalls = [], []
+            for q, expected in zip(queries, truth):
+                start = time.perf_counter()
+                results = index.search(q, k=k, nprobe=nprobe)
+                times.append(time.perf_counter() - start)
+                found = {code for code, _ in results}
+                recalls.append(len(found & set(expected)) / k)
+            print(
+                f"nprobe={nprobe:3d}: p50 {np.median(times) * 1000:7.2f} ms, "
+                f"p95 {np.percentile(times, 95) * 1000:7.2f} ms, "
+                f"recall@{k} {np.mean(recalls):.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark ANN index latency and recall@k against exact search."
+    )
+    parser.add_argument("--collection", default="arxiv_abstracts")
+    parser.add_argument(
+        "--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the DB."
+    )
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = parser.parse_args()
+    main(args.collection, args.synthetic, args.dim, args.queries, args.k, args.nprobe)
@@ -0,0 +1,65 @@
+import argparse
+import os, sys
+import time
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.environ.get("PROJECT_PATH"))
+os.chdir(os.environ.get("PROJECT_PATH"))
+
+import utils.db as db
+
+BENCHMARK_TABLE = "benchmark_bulk_load"
+
+
+def make_chunk_df(n_rows: int, text_len: int = 2000) -> pd.DataFrame:
+    """Synthetic frame shaped like `arxiv_chunks` (text, arxiv_code, chunk_id)."""
+    rng = np.random.default_rng(42)
+    alphabet = np.array(list("abcdefghijklmnopqrstuvwxyz ,.\"'"))
+    base_text = "".join(rng.choice(alphabet, text_len))
+    return pd.DataFrame(
+        {
+            "text": [base_text[i % 100 :] for i in range(n_rows)],
+            "arxiv_code": [f"2401.{i // 50:05d}" for i in range(n_rows)],
+            "chunk_id": [i % 50 for i in range(n_rows)],
+        }
+    )
+
+
+def time_upload(df: pd.DataFrame, method: str, seed: bool = False, **kwargs) -> float:
+    """Time an upload of `df` into the benchmark table; return rows/sec. With
+    `seed`, the table already holds the same rows (every upserted key conflicts)."""
+    db.execute_statement(f"DROP TABLE IF EXISTS {BENCHMARK_TABLE};")
+    if seed:
+        db.upload_df_to_db(df, BENCHMARK_TABLE, db.db_params, method="copy")
+    start = time.perf_counter()
+    db.upload_df_to_db(df, BENCHMARK_TABLE, db.db_params, method=method, **kwargs)
+    elapsed = time.perf_counter() - start
+    return len(df) / elapsed
+
+
+def main(n_rows: int):
+    df = make_chunk_df(n_rows)
+    results = {
+        "insert (multi, chunksize=10)": time_upload(df, "insert"),
+        "copy": time_upload(df, "copy"),
+        "copy (upsert, all conflicts)": time_upload(
+            df, "copy", seed=True, upsert_keys=["arxiv_code", "chunk_id"]
+        ),
+    }
+    db.execute_statement(f"DROP TABLE IF EXISTS {BENCHMARK_TABLE};")
+
+    print(f"Uploaded {n_rows} rows per method.")
+    for method, rows_sec in results.items():
+        print(f"{method:<30} {rows_sec:>12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare bulk load throughput of upload_df_to_db methods."
+    )
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.rows)
@@ -0,0 +1,42 @@
+import argparse
+import tempfile
+import time
+import os, sys
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.environ.get("PROJECT_PATH"))
+os.chdir(os.environ.get("PROJECT_PATH"))
+
+import utils.catalog as cat
+import utils.db as db
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(repeats: int):
+    catalog_df, db_time = timed(db.load_catalog)
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        path, publish_time = timed(cat.publish_snapshot, catalog_df, snapshot_dir)
+        size_mb = os.path.getsize(path) / 1e6
+        load_times = [
+            timed(cat.load_latest_snapshot, snapshot_dir)[1] for _ in range(repeats)
+        ]
+
+    print(f"Catalog rows: {len(catalog_df)}")
+    print(f"DB load (load_catalog):    {db_time:8.3f} s")
+    print(f"Snapshot publish:          {publish_time:8.3f} s ({size_mb:.1f} MB)")
+    print(f"Snapshot load (best of {repeats}): {min(load_times):8.3f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark catalog snapshot generation and loading vs. the DB."
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    main(args.repeats)
@@ -0,0 +1,82 @@
+import argparse
+import tempfile
+import time
+import os, sys
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.environ.get("PROJECT_PATH"))
+os.chdir(os.environ.get("PROJECT_PATH"))
+
+import utils.quantized_store as qs
+
+
+def synthetic_vectors(n: int, dim: int, rank: int = 64, seed: int = 42):
+    """Unit vectors near a random low-rank subspace (embeddings have a low
+    intrinsic dimension, so neighbourhoods are well defined)."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, rank)) @ rng.standard_normal((rank, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors += 0.2 * rng.standard_normal((n, dim)) / np.sqrt(dim)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [f"{i:07d}" for i in range(n)], np.zeros(n, dtype=int), vectors.astype(np.float32)
+
+
+def main(collection_name: str, n: int, dim: int, n_queries: int, k: int, oversamples: list):
+    if n:
+        codes, chunk_ids, vectors = synthetic_vectors(n, dim)
+    else:
+        codes, chunk_ids, vectors = qs.fetch_embeddings(collection_name)
+    print(f"Quantizing {len(codes)} vectors (dim={vectors.shape[1]})...")
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = qs.QuantizedStore.build(codes, chunk_ids, vectors)
+        store = qs.QuantizedStore.load(qs.ann.publish_index(store, collection_name, store_dir))
+        memory = store.memory()
+        for tier, size in memory.items():
+            print(
+                f"{tier:8s} {size / 2**20:9.1f} MB "
+                f"({size / memory['float32']:6.1%} of float32)"
+            )
+
+        ## Queries: perturbed corpus vectors (questions land near their chunks).
+        rng = np.random.default_rng(0)
+        queries = vectors[rng.choice(len(vectors), n_queries)]
+        queries = queries + 0.3 * rng.standard_normal(queries.shape) / np.sqrt(dim)
+
+        truth, exact_times = [], []
+        for q in queries:
+            start = time.perf_counter()
+            truth.append({row[:2] for row in store.exact_search(q, k)})
+            exact_times.append(time.perf_counter() - start)
+        print(f"float32 scan:          p50 {np.median(exact_times) * 1000:7.2f} ms")
+
+        for method in ["binary", "int8"]:
+            for oversample in oversamples:
+                times, recalls = [], []
+                for q, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    results = store.search(q, k=k, method=method, oversample=oversample)
+                    times.append(time.perf_counter() - start)
+                    recalls.append(len({row[:2] for row in results} & expected) / k)
+                print(
+                    f"{method:6s} x{oversample:<3d} rescore: p50 {np.median(times) * 1000:7.2f} ms, "
+                    f"recall@{k} {np.mean(recalls):.3f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark quantized first-stage search + float rescoring against a float32 scan."
+    )
+    parser.add_argument("--collection", default="arxiv_vectors_cv3")
+    parser.add_argument(
+        "--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the DB."
+    )
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--oversample", type=int, nargs="+", default=[4, 10, 20])
+    args = parser.parse_args()
+    main(args.collection, args.synthetic, args.dim, args.queries, args.k, args.oversample)
@@ -0,0 +1,80 @@
+import argparse
+import time
+import os, sys
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.environ.get("PROJECT_PATH"))
+os.chdir(os.environ.get("PROJECT_PATH"))
+
+import utils.app_utils as au
+import utils.rerankers as rr
+import utils.prompts as ps
+
+QUESTIONS = [
+    "How can LLMs be made to follow instructions more reliably?",
+    "What techniques reduce hallucinations in retrieval-augmented generation?",
+    "Which methods quantize LLM weights to 4 bits with little accuracy loss?",
+    "How do mixture-of-experts models route tokens?",
+    "What benchmarks evaluate LLM agents on web tasks?",
+    "How does speculative decoding speed up inference?",
+    "What are the main approaches to extending context length?",
+    "How is RLHF compared to direct preference optimization?",
+]
+
+
+def main(questions: list, baseline: str, rerankers: list, min_scores: list):
+    ## Same first-stage candidates for every reranker.
+    candidates = []
+    for question in questions:
+        criteria = ps.SearchCriteria(semantic_search_queries=[question])
+        candidates.append(au.retrieve_documents(question, criteria))
+    print(f"{len(questions)} questions, {np.mean([len(c) for c in candidates]):.1f} candidates each")
+
+    selections, latencies = {}, {}
+    for name in [baseline] + [r for r in rerankers if r != baseline]:
+        reranker = rr.get_reranker(name)
+        runs = [name]
+        if isinstance(reranker, rr.CrossEncoderReranker):
+            reranker.model  ## Load (and quantize) before timing.
+            runs = [f"{name}@{score}" for score in min_scores]
+        for run in runs:
+            if "@" in run:
+                reranker.min_score = float(run.split("@")[1])
+            selections[run], latencies[run] = [], []
+            for question, documents in zip(questions, candidates):
+                start = time.perf_counter()
+                selected = reranker.select(question, documents)
+                latencies[run].append(time.perf_counter() - start)
+                selections[run].append({d.arxiv_code for d in selected})
+
+    print(f"{'':22s} {'p50 ms':>9s} {'p95 ms':>9s} {'selected':>9s} {'jaccard':>8s} {'recall':>7s}")
+    reference = next(iter(selections.values()))  ## Baseline runs first.
+    for run, selected in selections.items():
+        jaccard = [len(s & r) / max(len(s | r), 1) for s, r in zip(selected, reference)]
+        recall = [len(s & r) / len(r) for s, r in zip(selected, reference) if r]
+        print(
+            f"{run:22s} {np.median(latencies[run]) * 1000:9.1f} "
+            f"{np.percentile(latencies[run], 95) * 1000:9.1f} "
+            f"{np.mean([len(s) for s in selected]):9.1f} "
+            f"{np.mean(jaccard):8.2f} {np.mean(recall) if recall else float('nan'):7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare reranker latency and selection agreement against a baseline reranker."
+    )
+    parser.add_argument("--questions", help="Text file with one question per line.")
+    parser.add_argument("--baseline", default="llm")
+    parser.add_argument("--rerankers", nargs="+", default=["cross_encoder"])
+    parser.add_argument(
+        "--min_score", type=float, nargs="+", default=[rr.RERANK_MIN_SCORE]
+    )
+    args = parser.parse_args()
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions) as f:
+            questions = [line.strip() for line in f if line.strip()]
+    main(questions, args.baseline, args.rerankers, args.min_score)
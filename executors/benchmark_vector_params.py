@@ -0,0 +1,125 @@
+import argparse
+import time
+import os, sys
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.environ.get("PROJECT_PATH"))
+os.chdir(os.environ.get("PROJECT_PATH"))
+
+import utils.app_utils as au
+import utils.db as db
+
+SELECT_SQL = (
+    "SELECT a.arxiv_code, a.title,  a.published, s.citation_count, a.summary AS abstract, "
+)
+FROM_SQL = "FROM arxiv_details a, semantic_details s, topics t, langchain_pg_embedding l "
+WHERE_SQL = (
+    "WHERE a.arxiv_code = s.arxiv_code "
+    "AND a.arxiv_code = t.arxiv_code "
+    "AND l.collection_id = %(collection_id)s "
+    "AND a.arxiv_code = (l.cmetadata ->> 'arxiv_code') "
+)
+
+
+def literal_query(vectors: list) -> tuple:
+    """The previous search SQL: every embedding inlined twice as an ARRAY literal."""
+    backend = db.get_backend()
+    vector_type = "vector" if backend.name == "postgres" else "DOUBLE[]"
+    distances = [
+        backend.vector_distance(
+            "l.embedding", f"CAST(ARRAY[{', '.join(map(str, v))}] AS {vector_type})"
+        )
+        for v in vectors
+    ]
+    return "\n".join(
+        [
+            SELECT_SQL + f"LEAST({', '.join(distances)})",
+            FROM_SQL,
+            WHERE_SQL,
+            f"AND ({' OR '.join(d + ' < 1' for d in distances)})",
+            "ORDER BY 6 ASC ",
+        ]
+    ), {"collection_id": db.get_collection_uuid(au.SEARCH_COLLECTION)}
+
+
+def bound_query(vectors: list) -> tuple:
+    """The current search SQL (top-k CTE per query), as built by `generate_query`'s
+    vector path."""
+    queries = [f"query {i}" for i in range(len(vectors))]
+    lookup = dict(zip(queries, vectors))
+    au.convert_query_to_vector = lambda query, model_name: lookup[query]
+    cte, from_item, condition, select, params = au.format_vector_condition(queries)
+    params["collection_id"] = db.get_collection_uuid(au.SEARCH_COLLECTION)
+    settings = db.get_backend().vector_search_settings(au.SEARCH_TOP_K)
+    sql = "\n".join(
+        [
+            f"{settings}WITH {cte}",
+            SELECT_SQL + select,
+            FROM_SQL + f", {from_item} ",
+            WHERE_SQL,
+            f"AND {condition}",
+            "ORDER BY 6 ASC ",
+        ]
+    )
+    return sql, params
+
+
+def payload_bytes(sql: str, params: dict = None) -> int:
+    """Bytes sent to the server for one statement."""
+    if db.get_backend().name == "postgres":
+        with db.pg_connection() as conn:
+            with conn.cursor() as cur:
+                return len(cur.mogrify(sql, params))
+    return len(sql.encode()) + sum(len(str(v)) for v in (params or {}).values())
+
+
+def time_ms(fn, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1000
+
+
+def main(n_queries: int, dim: int, repeats: int):
+    rng = np.random.default_rng(42)
+    vectors = [(v / np.linalg.norm(v)).tolist() for v in rng.standard_normal((n_queries, dim))]
+    literal_sql, literal_params = literal_query(vectors)
+    bound_sql, params = bound_query(vectors)
+
+    results = {
+        "literal": (
+            payload_bytes(literal_sql, literal_params),
+            time_ms(
+                lambda: db.execute_query("EXPLAIN " + literal_sql, params=literal_params),
+                repeats,
+            ),
+            time_ms(
+                lambda: db.execute_query(literal_sql, limit=20, params=literal_params),
+                repeats,
+            ),
+        ),
+        "bound": (
+            payload_bytes(bound_sql, params),
+            time_ms(lambda: db.execute_query("EXPLAIN " + bound_sql, params=params), repeats),
+            time_ms(lambda: db.execute_query(bound_sql, limit=20, params=params), repeats),
+        ),
+    }
+    print(f"{n_queries} semantic queries, dim={dim}, median of {repeats} runs")
+    print(f"{'':8s} {'payload KB':>11s} {'parse+plan ms':>14s} {'total ms':>9s}")
+    for name, (size, plan_ms, total_ms) in results.items():
+        print(f"{name:8s} {size / 1024:11.1f} {plan_ms:14.2f} {total_ms:9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare inlined ARRAY literals vs. bound vector params in the search SQL."
+    )
+    parser.add_argument("--queries", type=int, default=3)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    main(args.queries, args.dim, args.repeats)
@@ -0,0 +1,229 @@
+import argparse
+import json
+import uuid
+import os, sys
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.environ.get("PROJECT_PATH"))
+os.chdir(os.environ.get("PROJECT_PATH"))
+
+import utils.db as db
+
+## Collection ids match the production ones so query paths run unchanged.
+COLLECTIONS = {
+    "arxiv_abstracts": "7bf1c691-da2b-4a2b-81b3-e7dd165bfa39",
+    "arxiv_vectors_cv3": str(uuid.uuid5(uuid.NAMESPACE_URL, "arxiv_vectors_cv3")),
+}
+CHUNK_VERSION = "10000_1000"
+WORDS = (
+    "language model attention transformer token context retrieval agent reasoning "
+    "benchmark alignment instruction tuning prompt decoding quantization sparse "
+    "mixture expert scaling evaluation dataset synthetic multimodal vision code"
+).split()
+
+
+def random_text(rng, n_words: int) -> str:
+    return " ".join(rng.choice(WORDS, n_words)).capitalize() + "."
+
+
+def unit_vectors(rng, centers, assignments, noise: float):
+    """Clustered unit vectors: each row is its center plus gaussian noise."""
+    vectors = centers[assignments] + noise * rng.standard_normal(
+        (len(assignments), centers.shape[1])
+    )
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_corpus(n_papers: int, n_chunks: int, dim: int, n_topics: int, seed: int):
+    """Generate a synthetic corpus covering the tables read by `utils.db`."""
+    rng = np.random.default_rng(seed)
+    codes = [f"{2300 + i // 100000}.{i % 100000:05d}" for i in range(n_papers)]
+    published = pd.Timestamp("2023-01-01") + pd.to_timedelta(
+        rng.integers(0, 700, n_papers), unit="D"
+    )
+    tstp = pd.Timestamp.now().floor("s")
+    topic_ids = rng.integers(0, n_topics, n_papers)
+
+    tables = {}
+    tables["arxiv_details"] = pd.DataFrame(
+        {
+            "arxiv_code": codes,
+            "updated": published,
+            "published": published,
+            "title": [random_text(rng, 8) for _ in codes],
+            "summary": [random_text(rng, 120) for _ in codes],
+            "authors": ["A. Author, B. Author" for _ in codes],
+            "arxiv_comment": None,
+            "tstp": tstp,
+        }
+    )
+    tables["summaries"] = pd.DataFrame(
+        {
+            "arxiv_code": codes,
+            **{
+                col: [random_text(rng, 20) for _ in codes]
+                for col in [
+                    "contribution_title",
+                    "contribution_content",
+                    "takeaway_title",
+                    "takeaway_content",
+                    "takeaway_example",
+                    "novelty_analysis",
+                    "technical_analysis",
+                    "enjoyable_analysis",
+                ]
+            },
+            "category": "LLM",
+            "novelty_score": rng.integers(1, 4, n_papers).astype(str),
+            "technical_score": rng.integers(1, 4, n_papers).astype(str),
+            "enjoyable_score": rng.integers(1, 4, n_papers).astype(str),
+            "tstp": tstp,
+        }
+    )
+    tables["summary_notes"] = pd.DataFrame(
+        [
+            {
+                "arxiv_code": code,
+                "level": level,
+                "summary": random_text(rng, 200 // level),
+                "tokens": 2000 // level,
+                "tstp": tstp,
+            }
+            for code in codes
+            for level in (1, 2)
+        ]
+    )
+    for table_name in ["recursive_summaries", "bullet_list_summaries", "summary_markdown"]:
+        tables[table_name] = pd.DataFrame(
+            {
+                "arxiv_code": codes,
+                "summary": [random_text(rng, 80) for _ in codes],
+                "tstp": tstp,
+            }
+        )
+    tables["topics"] = pd.DataFrame(
+        {
+            "arxiv_code": codes,
+            "topic": [f"Topic {t}" for t in topic_ids],
+            "dim1": rng.standard_normal(n_papers),
+            "dim2": rng.standard_normal(n_papers),
+        }
+    )
+    tables["similar_documents"] = pd.DataFrame(
+        {
+            "arxiv_code": codes,
+            "similar_docs": [list(rng.choice(codes, 5)) for _ in codes],
+        }
+    )
+    tables["semantic_details"] = pd.DataFrame(
+        {
+            "paper_id": [uuid.uuid4().hex for _ in codes],
+            "arxiv_code": codes,
+            "venue": "arXiv",
+            "tldr": [random_text(rng, 15) for _ in codes],
+            "citation_count": rng.poisson(10, n_papers),
+            "influential_citation_count": rng.poisson(1, n_papers),
+        }
+    )
+    tables["tweet_reviews"] = pd.DataFrame(
+        {
+            "arxiv_code": codes,
+            "review": [random_text(rng, 30) for _ in codes],
+            "tstp": tstp,
+            "tweet_type": "insight_v1",
+            "rejected": False,
+        }
+    )
+
+    chunk_codes = np.repeat(codes, n_chunks)
+    chunk_ids = np.tile(np.arange(n_chunks), n_papers)
+    tables["arxiv_chunks"] = pd.DataFrame(
+        {
+            "arxiv_code": chunk_codes,
+            "chunk_id": chunk_ids,
+            "text": [random_text(rng, 60) for _ in chunk_ids],
+        }
+    )
+    tables["arxiv_parent_chunks"] = pd.DataFrame(
+        {
+            "arxiv_code": codes,
+            "chunk_id": 0,
+            "text": [random_text(rng, 300) for _ in codes],
+        }
+    )
+    tables["arxiv_chunk_map"] = pd.DataFrame(
+        {
+            "arxiv_code": chunk_codes,
+            "child_id": chunk_ids,
+            "parent_id": 0,
+            "version": CHUNK_VERSION,
+        }
+    )
+
+    ## Embeddings: papers cluster around topic centers, chunks around their paper.
+    topic_centers = rng.standard_normal((n_topics, dim))
+    paper_vectors = unit_vectors(rng, topic_centers, topic_ids, noise=0.5)
+    chunk_vectors = unit_vectors(
+        rng, paper_vectors, np.repeat(np.arange(n_papers), n_chunks), noise=0.3
+    )
+    tables["langchain_pg_collection"] = pd.DataFrame(
+        {"uuid": list(COLLECTIONS.values()), "name": list(COLLECTIONS.keys()), "cmetadata": None}
+    )
+    abstracts_df = pd.DataFrame(
+        {
+            "uuid": [str(uuid.uuid4()) for _ in codes],
+            "collection_id": COLLECTIONS["arxiv_abstracts"],
+            "embedding": list(paper_vectors),
+            "document": tables["recursive_summaries"]["summary"].values,
+            "cmetadata": [json.dumps({"arxiv_code": code}) for code in codes],
+            "custom_id": None,
+        }
+    )
+    chunks_df = pd.DataFrame(
+        {
+            "uuid": [str(uuid.uuid4()) for _ in chunk_ids],
+            "collection_id": COLLECTIONS["arxiv_vectors_cv3"],
+            "embedding": list(chunk_vectors),
+            "document": tables["arxiv_chunks"]["text"].values,
+            "cmetadata": [
+                json.dumps({"arxiv_code": code, "chunk_id": int(chunk_id)})
+                for code, chunk_id in zip(chunk_codes, chunk_ids)
+            ],
+            "custom_id": None,
+        }
+    )
+    tables["langchain_pg_embedding"] = pd.concat([abstracts_df, chunks_df])
+    tables["langchain_pg_embedding"]["embedding"] = tables["langchain_pg_embedding"][
+        "embedding"
+    ].map(lambda v: v.tolist())
+    return tables
+
+
+def main(n_papers: int, n_chunks: int, dim: int, n_topics: int, seed: int):
+    backend = db.get_backend()
+    if backend.name != "duckdb":
+        raise SystemExit("Refusing to load a synthetic corpus outside DB_BACKEND=duckdb.")
+
+    tables = build_corpus(n_papers, n_chunks, dim, n_topics, seed)
+    for table_name, table_df in tables.items():
+        db.execute_statement(f"DELETE FROM {table_name};")
+        db.upload_df_to_db(table_df, table_name, db.db_params)
+        print(f"{table_name}: {len(table_df)} rows")
+    db.refresh_catalog(db.db_params)
+    print(f"Synthetic corpus written to {backend.path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build a synthetic LLMpedia corpus in the local DuckDB backend."
+    )
+    parser.add_argument("--n_papers", type=int, default=5000)
+    parser.add_argument("--n_chunks", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--n_topics", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.n_papers, args.n_chunks, args.dim, args.n_topics, args.seed)
@@ -0,0 +1,31 @@
+import argparse
+import glob
+import json
+import os, sys
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.environ.get("PROJECT_PATH"))
+
+import utils.db_metrics as dm
+
+
+def main(metrics_dir: str, top: int):
+    files = glob.glob(os.path.join(metrics_dir, "db_metrics_*.json"))
+    if len(files) == 0:
+        print(f"No metrics found in {metrics_dir}. Run with DB_METRICS_DIR set.")
+        return
+    snapshots = [json.load(open(f)) for f in files]
+    summary_df = dm.summarize(snapshots)
+    print(f"Aggregated {len(files)} process snapshots.")
+    print(summary_df.head(top).to_string(index=False, float_format="%.1f"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Print p50/p95/p99 latency per db helper from dumped metrics."
+    )
+    parser.add_argument("metrics_dir", nargs="?", default=dm.METRICS_DIR or "data/db_metrics")
+    parser.add_argument("--top", type=int, default=50)
+    args = parser.parse_args()
+    main(args.metrics_dir, args.top)
@@ -2,7 +2,6 @@ import argparse
 import os, sys
 import pandas as pd
 from dotenv import load_dotenv
-import psycopg2
 
 load_dotenv()
 sys.path.append(os.environ.get("PROJECT_PATH"))
@@ -31,7 +30,7 @@ table_names = [
 
 
 def delete_from_db(arxiv_code: str):
-    with psycopg2.connect(**db.db_params) as conn:
+    with db.pg_connection(db.db_params) as conn:
         with conn.cursor() as cur:
             for table_name in table_names:
                 cur.execute(
@@ -0,0 +1,44 @@
+import argparse
+import os, sys
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.environ.get("PROJECT_PATH"))
+os.chdir(os.environ.get("PROJECT_PATH"))
+
+import utils.migrations as mg
+import utils.db as db
+
+
+def main(command: str):
+    backend = db.get_backend()
+    if not backend.supports_index_migrations:
+        print(f"Index migrations are not supported on the {backend.name} backend.")
+        return
+    if command == "migrate":
+        applied = mg.migrate()
+        print(f"Applied {len(applied)} migrations.")
+        vector_indexes = mg.ensure_vector_indexes()
+        print(f"Vector indexes in place: {', '.join(vector_indexes) or 'none'}.")
+    elif command == "verify":
+        print(mg.verify_indexes().to_string(index=False))
+    elif command == "report":
+        report_df = mg.report_missing_indexes()
+        if len(report_df) == 0:
+            print("All declared indexes are present.")
+        else:
+            print(report_df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Apply and verify the LLMpedia schema migrations."
+    )
+    parser.add_argument(
+        "command",
+        choices=["migrate", "verify", "report"],
+        nargs="?",
+        default="migrate",
+    )
+    args = parser.parse_args()
+    main(args.command)
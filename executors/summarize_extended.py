@@ -19,16 +19,12 @@ import utils.db as db
 def main():
     vs.validate_openai_env()
     title_map = db.get_arxiv_title_dict(db.db_params)
-    arxiv_codes = db.get_arxiv_id_list(db.db_params, "summary_notes")
-    done_codes = db.get_arxiv_id_list(db.db_params, "summary_markdown")
-    arxiv_codes = list(set(arxiv_codes) - set(done_codes))
-    arxiv_codes = sorted(arxiv_codes)[::-1]
+    arxiv_codes = db.get_pending_codes("summary_notes", "summary_markdown")
     # arxiv_codes = ["2404.05961"]
+    notes_map = db.get_extended_notes_many(arxiv_codes, expected_tokens=3000)
 
     for arxiv_code in tqdm(arxiv_codes):
-        paper_notes = db.get_extended_notes(
-            arxiv_code=arxiv_code, expected_tokens=3000
-        )
+        paper_notes = notes_map[arxiv_code]
         paper_title = title_map[arxiv_code]
 
         ## Convert notes to Markdown format and store.
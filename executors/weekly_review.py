@@ -21,8 +21,9 @@ meta_path = os.path.join(os.environ.get("PROJECT_PATH"), "data", "arxiv_meta")
 review_path = os.path.join(os.environ.get("PROJECT_PATH"), "data", "weekly_reviews")
 
 
-def main(date_str: str):
-    """Generate a weekly review of highlights and takeaways from papers."""
+def main(date_str: str, weekly_content_df=None, all_weekly_counts=None):
+    """Generate a weekly review of highlights and takeaways from papers.
+    Inputs and counts can be prefetched for a whole backfill range."""
     ## Check if we have the summary.
     vs.validate_openai_env()
     if db.check_weekly_summary_exists(date_str):
@@ -30,16 +31,18 @@ def main(date_str: str):
 
     ## Get data to generate summary.
     date_st = pd.to_datetime(date_str)
-    weekly_content_df = db.get_weekly_summary_inputs(date_str)
+    if weekly_content_df is None:
+        weekly_content_df = db.get_weekly_summary_inputs(date_str)
 
     ## Get weekly total counts for the last 4 weeks.
     prev_mondays = pd.date_range(
         date_st - pd.Timedelta(days=7 * 4), date_st, freq="W-MON"
     )
     prev_mondays = [date.strftime("%Y-%m-%d") for date in prev_mondays]
+    if all_weekly_counts is None:
+        all_weekly_counts = db.get_weekly_counts(prev_mondays[0], date_str)
     weekly_counts = {
-        date_str: len(db.get_weekly_summary_inputs(date_str))
-        for date_str in prev_mondays
+        monday_str: all_weekly_counts.get(monday_str, 0) for monday_str in prev_mondays
     }
 
     date_end = date_st + pd.Timedelta(days=6)
@@ -94,7 +97,19 @@ if __name__ == "__main__":
 
     date_range = pd.date_range(start_dt, end_dt, freq="W-MON")
     date_range = [date.strftime("%Y-%m-%d") for date in date_range]
+    if len(date_range) == 0:
+        sys.exit(0)
+
+    ## Prefetch inputs and counts for the whole range in one query each.
+    all_content_df = db.get_weekly_summary_inputs_range(date_range[0], date_range[-1])
+    counts_start = pd.to_datetime(date_range[0]) - pd.Timedelta(days=7 * 4)
+    all_weekly_counts = db.get_weekly_counts(counts_start, date_range[-1])
+
     for date_str in tqdm(date_range):
-        main(date_str)
+        week_df = all_content_df[
+            all_content_df["week_start"] == pd.to_datetime(date_str).date()
+        ]
+        week_df = week_df.drop(columns=["week_start"]).reset_index(drop=True)
+        main(date_str, week_df, all_weekly_counts)
         time.sleep(5)
 
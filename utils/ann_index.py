@@ -0,0 +1,293 @@
+"""In-process IVF index over a collection's embeddings, used for GPT Maestro's
+semantic candidates (metadata filters stay in SQL; without an index, search falls
+back to SQL). Versions are published to ANN_INDEX_DIR by l0_abstract_embedder and
+memory-mapped by the app; ANN_NPROBE trades latency for recall:
+    python executors/benchmark_ann_index.py [--synthetic 100000]
+"""
+from datetime import datetime
+import numpy as np
+import threading
+import shutil
+import glob
+import json
+import os
+
+import utils.db as db
+
+## Versioned on-disk indexes (one directory of .npy arrays each, memory-mapped on load).
+ANN_INDEX_DIR = os.getenv(
+    "ANN_INDEX_DIR",
+    os.path.join(os.environ.get("PROJECT_PATH", "."), "data", "ann_index"),
+)
+ANN_INDEX_KEEP = 2
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", 16))
+## Re-cluster once the unclustered (brute-force) delta exceeds this share of the index.
+ANN_REBUILD_RATIO = 0.1
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+
+def kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 10, seed: int = 0):
+    """Plain Lloyd k-means; returns the centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = assign_lists(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=n_clusters)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        filled = counts > 0
+        sums = np.add.reduceat(vectors[order], starts[filled], axis=0)
+        centroids[filled] = sums / counts[filled, None]
+        ## Re-seed empty clusters with random points.
+        centroids[~filled] = vectors[rng.choice(len(vectors), (~filled).sum())]
+    return centroids.astype(np.float32)
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 8192):
+    """Index of the nearest centroid (L2) for each vector."""
+    centroid_norms = (centroids**2).sum(axis=1)
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start : start + batch_size]
+        labels[start : start + batch_size] = np.argmin(
+            centroid_norms - 2 * batch @ centroids.T, axis=1
+        )
+    return labels
+
+
+class IVFIndex:
+    """Inverted-file ANN index: vectors grouped by nearest k-means centroid and
+    stored contiguously per list, so a query only scans the `nprobe` closest
+    lists. Rows added after the build live in a small brute-force delta."""
+
+    def __init__(
+        self,
+        centroids,
+        vectors,
+        norms,
+        offsets,
+        codes,
+        delta_vectors=None,
+        delta_codes=None,
+        source_dir: str = None,
+    ):
+        self.source_dir = source_dir
+        self.centroids = centroids
+        self.centroid_norms = (np.asarray(centroids) ** 2).sum(axis=1)
+        self.vectors = vectors
+        self.norms = norms
+        self.offsets = offsets
+        self.codes = codes
+        dim = centroids.shape[1]
+        self.delta_vectors = (
+            delta_vectors
+            if delta_vectors is not None
+            else np.empty((0, dim), dtype=np.float32)
+        )
+        self.delta_codes = (
+            delta_codes if delta_codes is not None else np.empty(0, dtype=codes.dtype)
+        )
+
+    @classmethod
+    def build(
+        cls,
+        codes,
+        vectors: np.ndarray,
+        n_lists: int = None,
+        n_iter: int = 10,
+        seed: int = 0,
+        train_size: int = 50000,
+    ):
+        """Cluster `vectors` (training on a sample) and lay them out by list."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        codes = np.asarray(codes, dtype=str)
+        n_lists = n_lists or max(1, int(np.sqrt(len(vectors))))
+        rng = np.random.default_rng(seed)
+        train = vectors
+        if len(vectors) > train_size:
+            train = vectors[rng.choice(len(vectors), train_size, replace=False)]
+        centroids = kmeans(train, n_lists, n_iter=n_iter, seed=seed)
+        labels = assign_lists(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(labels, minlength=n_lists))
+        vectors = vectors[order]
+        return cls(
+            centroids,
+            vectors,
+            (vectors**2).sum(axis=1),
+            offsets,
+            codes[order],
+        )
+
+    def __len__(self):
+        return len(self.codes) + len(self.delta_codes)
+
+    @property
+    def all_codes(self) -> set:
+        return set(self.codes.tolist()) | set(self.delta_codes.tolist())
+
+    @property
+    def needs_rebuild(self) -> bool:
+        return len(self.delta_codes) > ANN_REBUILD_RATIO * max(len(self.codes), 1)
+
+    def add(self, codes, vectors: np.ndarray):
+        """Append vectors to the brute-force delta (searched on every query)."""
+        self.delta_vectors = np.concatenate(
+            [self.delta_vectors, np.asarray(vectors, dtype=np.float32)]
+        )
+        self.delta_codes = np.concatenate(
+            [self.delta_codes, np.asarray(codes, dtype=str)]
+        )
+
+    def search(self, query, k: int = 100, nprobe: int = ANN_NPROBE) -> list:
+        """Approximate k nearest papers as [(arxiv_code, l2_distance)], closest first."""
+        query = np.asarray(query, dtype=np.float32)
+        nprobe = min(nprobe, len(self.centroids))
+        centroid_dist = self.centroid_norms - 2 * (self.centroids @ query)
+        probe = np.argpartition(centroid_dist, nprobe - 1)[:nprobe]
+
+        codes, dists = [], []
+        for list_id in probe:
+            lo, hi = self.offsets[list_id], self.offsets[list_id + 1]
+            if hi > lo:
+                dists.append(self.norms[lo:hi] - 2 * (self.vectors[lo:hi] @ query))
+                codes.append(self.codes[lo:hi])
+        if len(self.delta_codes):
+            dists.append(
+                (self.delta_vectors**2).sum(axis=1) - 2 * (self.delta_vectors @ query)
+            )
+            codes.append(self.delta_codes)
+        if not dists:
+            return []
+        dists = np.concatenate(dists) + query @ query
+        codes = np.concatenate(codes)
+
+        ## Over-fetch to absorb papers with more than one vector.
+        top = min(len(dists), 2 * k)
+        top_idx = np.argpartition(dists, top - 1)[:top]
+        top_idx = top_idx[np.argsort(dists[top_idx])]
+        results, seen = [], set()
+        for i in top_idx:
+            if codes[i] not in seen:
+                seen.add(codes[i])
+                results.append((str(codes[i]), float(np.sqrt(max(dists[i], 0)))))
+                if len(results) == k:
+                    break
+        return results
+
+    def save(self, index_dir: str):
+        """Write the index arrays to a new directory (atomically renamed). The
+        clustered arrays are hard-linked when unchanged since `load`."""
+        tmp_dir = index_dir + ".tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        arrays = {
+            "centroids": self.centroids,
+            "vectors": self.vectors,
+            "norms": self.norms,
+            "offsets": self.offsets,
+            "codes": self.codes,
+        }
+        for name, array in arrays.items():
+            path = os.path.join(tmp_dir, f"{name}.npy")
+            if self.source_dir:
+                os.link(os.path.join(self.source_dir, f"{name}.npy"), path)
+            else:
+                np.save(path, np.asarray(array))
+        np.save(os.path.join(tmp_dir, "delta_vectors.npy"), self.delta_vectors)
+        np.save(os.path.join(tmp_dir, "delta_codes.npy"), self.delta_codes)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(
+                {"size": len(self), "n_lists": len(self.centroids), "dim": self.centroids.shape[1]},
+                f,
+            )
+        os.replace(tmp_dir, index_dir)
+        return index_dir
+
+    @classmethod
+    def load(cls, index_dir: str):
+        """Memory-map a saved index."""
+        arrays = {
+            name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+            for name in ["vectors", "norms", "codes"]
+        }
+        for name in ["centroids", "offsets", "delta_vectors", "delta_codes"]:
+            arrays[name] = np.load(os.path.join(index_dir, f"{name}.npy"))
+        return cls(**arrays, source_dir=index_dir)
+
+
+def list_indexes(collection_name: str, index_dir: str = ANN_INDEX_DIR) -> list:
+    """Saved index directories of a collection, newest first."""
+    paths = glob.glob(os.path.join(index_dir, collection_name, "index_*"))
+    paths = [p for p in paths if not p.endswith(".tmp")]
+    return sorted(paths, reverse=True)
+
+
+def publish_index(index: IVFIndex, collection_name: str, index_dir: str = ANN_INDEX_DIR):
+    """Save a new version of the collection's index and prune old ones."""
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    path = index.save(os.path.join(index_dir, collection_name, f"index_{version}"))
+    for old_path in list_indexes(collection_name, index_dir)[ANN_INDEX_KEEP:]:
+        shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+def fetch_embeddings(collection_name: str, arxiv_codes: list = None, batch_size=5000):
+    """Load a collection's embeddings from the DB as (codes, float32 matrix)."""
+    codes, batches, batch = [], [], []
+    for arxiv_code, _, embedding in db.iter_collection_embeddings(
+        collection_name, arxiv_codes
+    ):
+        codes.append(arxiv_code)
+        batch.append(embedding)
+        if len(batch) == batch_size:
+            batches.append(np.asarray(batch, dtype=np.float32))
+            batch = []
+    if batch:
+        batches.append(np.asarray(batch, dtype=np.float32))
+    if not batches:
+        return codes, None
+    return codes, np.concatenate(batches)
+
+
+def build_index(collection_name: str, index_dir: str = ANN_INDEX_DIR):
+    """Build the collection's index from scratch and publish it."""
+    codes, vectors = fetch_embeddings(collection_name)
+    if vectors is None:
+        return None
+    return publish_index(IVFIndex.build(codes, vectors), collection_name, index_dir)
+
+
+def update_index(collection_name: str, index_dir: str = ANN_INDEX_DIR):
+    """Add papers embedded since the last publish (re-clustering when the delta
+    grows too large) and publish the result."""
+    paths = list_indexes(collection_name, index_dir)
+    if len(paths) == 0:
+        return build_index(collection_name, index_dir)
+    index = IVFIndex.load(paths[0])
+    missing = set(db.get_arxiv_id_embeddings(collection_name)) - index.all_codes
+    if len(missing) == 0:
+        return paths[0]
+    codes, vectors = fetch_embeddings(collection_name, sorted(missing))
+    index.add(codes, vectors)
+    if index.needs_rebuild:
+        return build_index(collection_name, index_dir)
+    return publish_index(index, collection_name, index_dir)
+
+
+def get_index(collection_name: str, index_dir: str = ANN_INDEX_DIR):
+    """Process-wide index for a collection, reloaded when a newer version is
+    published; None if none has been built."""
+    paths = list_indexes(collection_name, index_dir)
+    if len(paths) == 0:
+        return None
+    path, index = _loaded.get(collection_name, (None, None))
+    if path != paths[0]:
+        with _load_lock:
+            path, index = _loaded.get(collection_name, (None, None))
+            if path != paths[0]:
+                index = IVFIndex.load(paths[0])
+                _loaded[collection_name] = (paths[0], index)
+    return index
@@ -0,0 +1,193 @@
+"""GPT Maestro answer cache: repeated questions are answered without any LLM call
+while the corpus is unchanged. Entries are shared between app processes through
+SQLite.
+"""
+import numpy as np
+import threading
+import sqlite3
+import json
+import time
+import os
+
+import utils.embeddings as emb
+import utils.db as db
+
+## GPT Maestro answers, reused for repeated questions until they expire or new
+## papers land in the corpus.
+ANSWER_CACHE_PATH = os.getenv(
+    "ANSWER_CACHE_PATH",
+    os.path.join(os.environ.get("PROJECT_PATH", "."), "data", "answer_cache.sqlite"),
+)
+## Cosine similarity at which a differently worded question reuses an answer.
+## Unset by default: close paraphrases can ask opposite things ("pros of X" /
+## "cons of X"), so only exact (normalized) repeats are served.
+ANSWER_CACHE_THRESHOLD = (
+    float(os.environ["ANSWER_CACHE_THRESHOLD"])
+    if os.getenv("ANSWER_CACHE_THRESHOLD")
+    else None
+)
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 24 * 3600))
+ANSWER_CACHE_MODEL = "embed-english-v3.0"
+## Seconds between checks of the corpus watermark and of other processes' entries.
+WATERMARK_CHECK_SECONDS = 60
+
+
+def corpus_watermark() -> str:
+    """Changes whenever new papers are added to the corpus."""
+    return str(db.get_latest_tstp(db.db_params, "arxiv_details"))
+
+
+class AnswerCache:
+    """Answers keyed by normalized question and response length, served while
+    younger than `ttl` seconds and the corpus watermark is unchanged. With a
+    `threshold`, a question within that cosine similarity of a cached one also
+    gets its answer. Entries are kept in memory and shared through SQLite."""
+
+    def __init__(
+        self,
+        path: str = ANSWER_CACHE_PATH,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: int = ANSWER_CACHE_TTL,
+        model_name: str = ANSWER_CACHE_MODEL,
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.model_name = model_name
+        self.entries = []
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        self.watermark = None
+        self._watermark_checked = 0.0
+        ## Highest SQLite rowid loaded, and rowids this process wrote itself.
+        self._last_rowid = 0
+        self._own_rowids = set()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _disk(self):
+        if self._conn is None and self.path:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers (question TEXT, response_length TEXT, "
+                "vector BLOB, answer TEXT, arxiv_codes TEXT, watermark TEXT, created REAL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _add(self, question, response_length, vector, answer, arxiv_codes, created):
+        self.entries.append(
+            {
+                "question": emb.normalize_query(question),
+                "response_length": response_length,
+                "answer": answer,
+                "arxiv_codes": list(arxiv_codes),
+                "created": created,
+            }
+        )
+        self.vectors = (
+            np.vstack([self.vectors, vector]) if len(self.vectors) else vector[None, :]
+        )
+
+    def _refresh(self):
+        """Drop everything when the corpus watermark moves, and load entries
+        written (by any process) since the last load."""
+        now = time.time()
+        recently_checked = now - self._watermark_checked < WATERMARK_CHECK_SECONDS
+        if self.watermark is not None and recently_checked:
+            return
+        watermark = corpus_watermark()
+        self._watermark_checked = now
+        disk = self._disk()
+        if watermark != self.watermark:
+            if self.watermark is not None:
+                self.stats["invalidations"] += 1
+            self.watermark = watermark
+            self.entries = []
+            self.vectors = np.empty((0, 0), dtype=np.float32)
+            self._last_rowid = 0
+            self._own_rowids = set()
+            if disk is not None:
+                disk.execute(
+                    "DELETE FROM answers WHERE watermark != ? OR created < ?",
+                    (watermark, now - self.ttl),
+                )
+                disk.commit()
+        if disk is None:
+            return
+        rows = disk.execute(
+            "SELECT rowid, * FROM answers WHERE rowid > ? AND watermark = ? ORDER BY rowid",
+            (self._last_rowid, watermark),
+        ).fetchall()
+        for row in rows:
+            rowid, question, response_length, vector, answer, arxiv_codes, _, created = row
+            self._last_rowid = max(self._last_rowid, rowid)
+            if rowid in self._own_rowids:
+                continue
+            vector = np.frombuffer(vector, dtype=np.float32)
+            self._add(
+                question, response_length, vector, answer, json.loads(arxiv_codes), created
+            )
+
+    def embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(emb.embed_query(question, self.model_name), dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def get(self, question: str, response_length: str):
+        """Cached (answer, arxiv_codes) for the question, or None."""
+        normalized = emb.normalize_query(question)
+        vector = self.embed(question) if self.threshold is not None else None
+        with self._lock:
+            self._refresh()
+            if len(self.entries) > 0:
+                created = np.array([e["created"] for e in self.entries])
+                lengths = np.array([e["response_length"] for e in self.entries])
+                live = (created >= time.time() - self.ttl) & (lengths == response_length)
+                exact = live & np.array([e["question"] == normalized for e in self.entries])
+                if exact.any():
+                    best = int(np.flatnonzero(exact)[-1])
+                elif vector is not None:
+                    similarity = np.where(live, self.vectors @ vector, -1)
+                    best = int(np.argmax(similarity))
+                    if similarity[best] < self.threshold:
+                        best = None
+                else:
+                    best = None
+                if best is not None:
+                    self.stats["hits"] += 1
+                    entry = self.entries[best]
+                    return entry["answer"], list(entry["arxiv_codes"])
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, question: str, response_length: str, answer: str, arxiv_codes: list):
+        vector = self.embed(question)
+        created = time.time()
+        with self._lock:
+            self._refresh()
+            self._add(question, response_length, vector, answer, arxiv_codes, created)
+            disk = self._disk()
+            if disk is not None:
+                cursor = disk.execute(
+                    "INSERT INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        question,
+                        response_length,
+                        vector.tobytes(),
+                        answer,
+                        json.dumps(list(arxiv_codes)),
+                        self.watermark,
+                        created,
+                    ),
+                )
+                disk.commit()
+                self._own_rowids.add(cursor.lastrowid)
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+
+answer_cache = AnswerCache()
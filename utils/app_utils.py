@@ -1,27 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel
+from typing import Optional
 import pandas as pd
+import threading
 import datetime
 import json
+import time
 import os, re
 
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain.retrievers.document_compressors import CohereRerank
-from langchain_community.embeddings.huggingface import HuggingFaceEmbeddings
 from langchain_community.embeddings.huggingface import HuggingFaceInferenceAPIEmbeddings
-from langchain_cohere import CohereEmbeddings
 from langchain.prompts.chat import ChatPromptTemplate
 from langchain.chains import LLMChain
 
 from utils.custom_langchain import NewCohereEmbeddings, NewPGVector
 from utils.models import llm_map
-from utils.instruct import run_instructor_query
+from utils.instruct import run_instructor_query, stream_instructor_query
+import utils.answer_cache as ac
+import utils.embeddings as emb
+import utils.migrations as mg
+import utils.ann_index as ann
+import utils.rerankers as rr
+import utils.bm25 as bm25
 import utils.prompts as ps
 import utils.db as db
 
-CONNECTION_STRING = (
-    f"postgresql+psycopg2://{db.db_params['user']}:{db.db_params['password']}"
-    f"@{db.db_params['host']}:{db.db_params['port']}/{db.db_params['dbname']}"
-)
+CONNECTION_STRING = db.database_url
 
 report_sections_map = {
     "scratchpad": "Scratchpad",
@@ -54,6 +59,32 @@ def add_links_to_text_blob(response: str):
     return re.sub(r"arxiv:(\d{4}\.\d{4,5})", repl, response)
 
 
+def transform_stream(chunks, transform=add_links_to_text_blob):
+    """Apply `transform` to a stream of text chunks, one completed span at a time.
+    Text after the last whitespace is held back, so arxiv codes (and tags) are
+    never split across spans."""
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        cut = re.search(r"\S*\Z", buffer).start()
+        if cut > 0:
+            yield transform(buffer[:cut])
+            buffer = buffer[cut:]
+    if buffer:
+        yield transform(buffer)
+
+
+def time_stream(chunks, timings: dict, start: float = None):
+    """Pass a stream through, recording the seconds from `start` to the first
+    chunk (`first_token`) and to the end of the stream (`total`) in `timings`."""
+    start = time.perf_counter() if start is None else start
+    for chunk in chunks:
+        if "first_token" not in timings:
+            timings["first_token"] = time.perf_counter() - start
+        yield chunk
+    timings["total"] = time.perf_counter() - start
+
+
 def extract_arxiv_codes(text: str):
     """Extract unique arxiv codes from the text."""
     arxiv_codes = re.findall(r"arxiv:(\d{4}\.\d{4,5})", text)
@@ -95,10 +126,12 @@ def initialize_retriever(collection_name):
     else:
         raise ValueError(f"Unknown collection name: {collection_name}")
 
+    ## Bound to the shared pooled engine (sessions check out their own connection).
     store = NewPGVector(
         collection_name=collection_name,
         connection_string=CONNECTION_STRING,
         embedding_function=embeddings,
+        connection=db.get_engine(),
     )
     retriever = store.as_retriever(search_type="similarity", search_kwargs={"k": 20})
 
@@ -111,6 +144,47 @@ def initialize_retriever(collection_name):
     return compression_retriever
 
 
+## Collections whose retrievers are built when the app starts.
+WARM_UP_COLLECTIONS = ["arxiv_vectors_cv3"]
+
+_retrievers = {}
+_retriever_lock = threading.Lock()
+## Construction seconds per retriever / retrieval component.
+build_times = {}
+
+
+def get_retriever(collection_name):
+    """Process-wide compression retriever for a collection (built once)."""
+    if collection_name not in _retrievers:
+        with _retriever_lock:
+            if collection_name not in _retrievers:
+                start = time.perf_counter()
+                _retrievers[collection_name] = initialize_retriever(collection_name)
+                build_times[collection_name] = time.perf_counter() - start
+    return _retrievers[collection_name]
+
+
+def warm_up_retrieval(collection_names: list = WARM_UP_COLLECTIONS) -> dict:
+    """Build the retrievers, the query embedding client, the search indexes and
+    the reranker ahead of the first question; returns construction seconds per component."""
+    components = {
+        **{name: lambda name=name: get_retriever(name) for name in collection_names},
+        "embeddings": lambda: emb.get_embedding_client("embed-english-v3.0"),
+        "ann_index": lambda: ann.get_index(SEARCH_COLLECTION),
+        "bm25_index": lambda: bm25.get_index(),
+        "reranker": lambda: getattr(rr.get_reranker(), "model", None),
+    }
+    for name, build in components.items():
+        start = time.perf_counter()
+        try:
+            build()
+        except Exception as e:
+            print(f"Could not warm up {name}: {e}")
+            continue
+        build_times.setdefault(name, time.perf_counter() - start)
+    return dict(build_times)
+
+
 def create_rag_context(parent_docs: pd.DataFrame) -> str:
     """Create RAG context for LLM, including text excerpts, arxiv_codes,
     year of publication and citation counts."""
@@ -140,8 +214,46 @@ def question_to_query(question: str, model: str = "GPT-3.5-Turbo"):
     return query
 
 
-def query_llmpedia(question: str, collection_name: str, model: str = "GPT-3.5-Turbo"):
-    """Query LLMpedia via LLMChain."""
+## Sub-queries are retrieved concurrently (each is a vector search, a rerank call
+## and a parent-chunk lookup), so latency tracks the slowest one.
+QUERY_WORKERS = 4
+
+
+def retrieve_parent_docs(compression_retriever, query: str) -> tuple:
+    """Retrieve and rerank child chunks for a sub-query and map them to their
+    parent chunks (top 3, newest and most cited first), with phase timings."""
+    timings = {"query": query}
+    start = time.perf_counter()
+    child_docs = compression_retriever.invoke(query)
+    timings["retrieve"] = time.perf_counter() - start
+
+    ## Map to parent chunk (for longer context).
+    start = time.perf_counter()
+    child_docs = [doc.metadata for doc in child_docs]
+    child_ids = [(doc["arxiv_code"], doc["chunk_id"]) for doc in child_docs]
+    parent_docs = db.get_arxiv_parent_chunks(child_ids)
+    timings["parent_chunks"] = time.perf_counter() - start
+    if len(parent_docs) == 0:
+        return None, timings
+    parent_docs["published"] = pd.to_datetime(parent_docs["published"]).dt.year
+    parent_docs.sort_values(
+        by=["published", "citation_count"], ascending=False, inplace=True
+    )
+    parent_docs.reset_index(drop=True, inplace=True)
+    parent_docs["subject"] = query
+    return parent_docs.head(3), timings
+
+
+def query_llmpedia(
+    question: str,
+    collection_name: str,
+    model: str = "GPT-3.5-Turbo",
+    timings: dict = None,
+):
+    """Query LLMpedia via LLMChain. Per-phase timings (seconds) are written to
+    `timings` when given."""
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
     rag_prompt_custom = ChatPromptTemplate.from_messages(
         [
             ("system", ps.VS_SYSTEM_TEMPLATE),
@@ -152,34 +264,33 @@ def query_llmpedia(question: str, collection_name: str, model: str = "GPT-3.5-Tu
     rag_llm_chain = LLMChain(
         llm=llm_map[model], prompt=rag_prompt_custom, verbose=False
     )
-    compression_retriever = initialize_retriever(collection_name)
+    compression_retriever = get_retriever(collection_name)
+    timings["setup"] = time.perf_counter() - start
+
+    start = time.perf_counter()
     queries = question_to_query(question, model=model)
     queries_list = json.loads(queries)
-    all_parent_docs = []
-    for query in queries_list:
-        child_docs = compression_retriever.invoke(query)
-
-        ## Map to parent chunk (for longer context).
-        child_docs = [doc.metadata for doc in child_docs]
-        child_ids = [(doc["arxiv_code"], doc["chunk_id"]) for doc in child_docs]
-        parent_ids = db.get_arxiv_parent_chunk_ids(child_ids)
-        parent_docs = db.get_arxiv_chunks(parent_ids, source="parent")
-        if len(parent_docs) == 0:
-            continue
-        parent_docs["published"] = pd.to_datetime(parent_docs["published"]).dt.year
-        parent_docs.sort_values(
-            by=["published", "citation_count"], ascending=False, inplace=True
+    timings["question_to_query"] = time.perf_counter() - start
+
+    ## Results are merged in sub-query order, whatever order they complete in.
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=QUERY_WORKERS) as executor:
+        results = list(
+            executor.map(
+                lambda query: retrieve_parent_docs(compression_retriever, query),
+                queries_list,
+            )
         )
-        parent_docs.reset_index(drop=True, inplace=True)
-        parent_docs["subject"] = query
-        parent_docs = parent_docs.head(3)
-        all_parent_docs.append(parent_docs)
+    timings["retrieval"] = time.perf_counter() - start
+    timings["sub_queries"] = [query_timings for _, query_timings in results]
 
-    all_parent_docs = pd.concat(all_parent_docs, ignore_index=True)
+    all_parent_docs = [docs for docs, _ in results if docs is not None]
     if len(all_parent_docs) == 0:
         return "No results found."
+    all_parent_docs = pd.concat(all_parent_docs, ignore_index=True)
 
     ## Create custom prompt.
+    start = time.perf_counter()
     all_parent_docs.drop_duplicates(subset=["text"], inplace=True)
     rag_context = create_rag_context(all_parent_docs)
     res = rag_llm_chain.invoke(dict(context=rag_context, question=question))["text"]
@@ -188,6 +299,7 @@ def query_llmpedia(question: str, collection_name: str, model: str = "GPT-3.5-Tu
         content = add_links_to_text_blob(res_response)
     else:
         content = res[:]
+    timings["generation"] = time.perf_counter() - start
 
     return content
 
@@ -203,7 +315,7 @@ class Document(BaseModel):
     published_date: datetime.datetime
     citations: int
     abstract: str
-    distance: float
+    distance: Optional[float] = None
     notes: str = None
 
 
@@ -221,14 +333,20 @@ query_config_json = """
 query_config = json.loads(query_config_json)
 
 
-def interrogate_paper(question: str, arxiv_code: str) -> str:
-    """Ask a question about a paper."""
+def strip_response_tags(text: str) -> str:
+    return text.replace("<response>", "").replace("</response>", "")
+
+
+def interrogate_paper(question: str, arxiv_code: str, stream: bool = False):
+    """Ask a question about a paper (a stream of text chunks if `stream`)."""
     context = db.get_extended_notes(arxiv_code, expected_tokens=8000)
     system_message = "Read carefully the whitepaper, reason about the user question, and provide a comprehensive, git helpful and truthful response. Be direct and concise, using layman's language that is easy to understand. Avoid filler content, and reply with your answer in a single short sentence or paragraph and nothing else (no preambles, greetings, etc.)."
     user_message = ps.create_interrogate_user_prompt(question, context)
+    if stream:
+        chunks = stream_instructor_query(system_message, user_message, llm_model="gpt-4o")
+        return transform_stream(chunks, strip_response_tags)
     response = run_instructor_query(system_message, user_message, None, llm_model="gpt-4o")
-    response = response.replace("<response>", "").replace("</response>", "")
-    return response
+    return strip_response_tags(response)
 
 
 def decide_query_action(user_question: str) -> ps.QueryDecision:
@@ -240,126 +358,319 @@ def decide_query_action(user_question: str) -> ps.QueryDecision:
 
 
 def convert_query_to_vector(query: str, model_name: str):
-    if "embed-english" in model_name:
-        embeddings = CohereEmbeddings(
-            cohere_api_key=os.getenv("COHERE_API_KEY"), model=model_name
-        )
-    else:
-        embeddings = HuggingFaceEmbeddings(model_name=model_name)
-
-    return embeddings.embed_query(query)
+    """Embed a search query (cached per model and normalized text)."""
+    return emb.embed_query(query, model_name)
 
 
 def format_query_condition(field_name: str, template: str, value: str):
-    if isinstance(value, list) and "semantic_search_queries" in field_name:
-        distance_scores = []
-        for query in value:
-            vector = convert_query_to_vector(query, "embed-english-v3.0")
-            vector_str = ", ".join(map(str, vector))
-            condition = f"l.embedding <-> ARRAY[{vector_str}]::vector "
-            distance_scores.append(condition)
-        if distance_scores:
-            min_distance = f"LEAST({', '.join(distance_scores)})"
-            return (
-                f"({' OR '.join([c + ' < 1' for c in distance_scores])})",
-                min_distance,
-            )
-        else:
-            return "AND TRUE", "0 as min_distance"
-    elif isinstance(value, list):
+    if isinstance(value, list):
         value_str = "', '".join(value)
-        return template % value_str, "0 as min_distance"
+        condition = template % value_str
     else:
-        return template % value, "0 as min_distance"
+        condition = template % value
+    ## The search SQL is run with bound params, so literal '%' must be escaped.
+    return condition.replace("%", "%%"), "0 as min_distance"
 
 
-def generate_query(criteria: ps.SearchCriteria, config: dict) -> str:
+## Collection searched by GPT Maestro and nearest neighbours fetched per semantic query.
+SEARCH_COLLECTION = "arxiv_abstracts"
+SEARCH_TOP_K = 100
+
+
+def format_vector_condition(queries: list, k: int = SEARCH_TOP_K):
+    """Semantic condition as one index-friendly top-k CTE per query (ORDER BY
+    distance LIMIT k within the collection), unioned into the closest distance
+    per paper. Each embedding is bound once as a parameter."""
+    backend = db.get_backend()
+    column = backend.vector_column(
+        "l.embedding", mg.VECTOR_INDEX_COLLECTIONS[SEARCH_COLLECTION]
+    )
+    params, ctes = {}, []
+    for i, query in enumerate(queries):
+        vector = convert_query_to_vector(query, "embed-english-v3.0")
+        params[f"q{i}"] = db.vector_literal(vector)
+        distance = backend.vector_distance(column, backend.vector_param(f"q{i}"))
+        ctes.append(
+            f"q{i} AS (\n"
+            f"    SELECT (l.cmetadata ->> 'arxiv_code') AS arxiv_code, {distance} AS distance\n"
+            "    FROM langchain_pg_embedding l\n"
+            "    WHERE l.collection_id = %(collection_id)s\n"
+            f"    ORDER BY distance LIMIT {k}\n"
+            ")"
+        )
+    union = " UNION ALL ".join(f"SELECT * FROM q{i}" for i in range(len(queries)))
+    ctes.append(
+        "distances AS (\n"
+        "    SELECT arxiv_code, MIN(distance) AS min_distance\n"
+        f"    FROM ({union}) c\n"
+        "    WHERE distance < 1\n"
+        "    GROUP BY arxiv_code\n"
+        ")"
+    )
+    condition = "a.arxiv_code = d.arxiv_code"
+    return ",\n".join(ctes), "distances d", condition, "d.min_distance", params
+
+
+## Candidates fetched per semantic query from the in-process ANN index.
+ANN_CANDIDATES = 200
+
+
+def format_ann_condition(queries: list, index: ann.IVFIndex):
+    """Semantic condition from ANN candidates (closest distance per paper across
+    queries), as a CTE plus the condition, distance column and bound parameters."""
+    distances = {}
+    for query in queries:
+        vector = convert_query_to_vector(query, "embed-english-v3.0")
+        for arxiv_code, distance in index.search(vector, k=ANN_CANDIDATES):
+            if distance < 1:
+                distances[arxiv_code] = min(distance, distances.get(arxiv_code, 1))
+    if not distances:
+        return None, None, "FALSE", "NULL AS min_distance", {}
+    ## Bound as two parallel arrays, so the SQL text is the same for every query.
+    cte = (
+        "ann AS (\n"
+        "    SELECT unnest(CAST(%(ann_codes)s AS text[])) AS arxiv_code,\n"
+        "           unnest(CAST(%(ann_dists)s AS float8[])) AS min_distance\n"
+        ")"
+    )
+    params = {
+        "ann_codes": list(distances),
+        "ann_dists": [float(dist) for dist in distances.values()],
+    }
+    return cte, "ann", "a.arxiv_code = ann.arxiv_code", "ann.min_distance", params
+
+
+def generate_query(
+    criteria: ps.SearchCriteria, config: dict, arxiv_codes: list = None
+) -> tuple:
+    """Build the paper search SQL and its bound parameters (query embeddings),
+    optionally restricted to some arxiv codes."""
     query_parts = [
         "SELECT a.arxiv_code, a.title,  a.published, s.citation_count, a.summary AS abstract, ",
         "FROM arxiv_details a, semantic_details s, topics t, langchain_pg_embedding l ",
         "WHERE a.arxiv_code = s.arxiv_code "
         "AND a.arxiv_code = t.arxiv_code "
-        "AND l.collection_id = '7bf1c691-da2b-4a2b-81b3-e7dd165bfa39' "
-        "AND a.arxiv_code = l.cmetadata ->> 'arxiv_code' ",
+        "AND l.collection_id = %(collection_id)s "
+        "AND a.arxiv_code = (l.cmetadata ->> 'arxiv_code') ",
     ]
     extra_selects = []
+    params = {"collection_id": db.get_collection_uuid(SEARCH_COLLECTION)}
+    semantic_cte, semantic_from, settings = None, None, ""
 
     for field, value in criteria.model_dump(exclude_none=True).items():
         if field in config:
-            condition_str, max_similarity = format_query_condition(
-                field, config[field], value
-            )
+            if field == "semantic_search_queries":
+                ## Candidates come from the ANN index when built, else from SQL.
+                ann_index = ann.get_index(SEARCH_COLLECTION)
+                if ann_index is not None:
+                    semantic = format_ann_condition(value, ann_index)
+                else:
+                    semantic = format_vector_condition(value)
+                    settings = db.get_backend().vector_search_settings(SEARCH_TOP_K)
+                semantic_cte, semantic_from, condition_str, max_similarity = semantic[:4]
+                params.update(semantic[4])
+            else:
+                condition_str, max_similarity = format_query_condition(
+                    field, config[field], value
+                )
             query_parts.append(f"AND {condition_str}")
             extra_selects.append(max_similarity)
 
+    if arxiv_codes is not None:
+        query_parts.append(
+            "AND a.arxiv_code IN (SELECT unnest(CAST(%(arxiv_codes)s AS text[])))"
+        )
+        extra_selects.append("NULL AS min_distance")
+        params["arxiv_codes"] = list(arxiv_codes)
+
     if len(extra_selects) > 1:
         extra_selects = list(filter(lambda x: x != "0 as min_distance", extra_selects))
 
     query_parts[0] += ", ".join(extra_selects)
     query_parts.append("ORDER BY 6 ASC ")
+    if semantic_cte:
+        query_parts[1] += f", {semantic_from} "
+        query_parts.insert(0, f"{settings}WITH {semantic_cte}")
 
-    return "\n".join(query_parts)
-
+    return "\n".join(query_parts), params
 
-def rerank_documents_new(user_question: str, documents: list) -> ps.RerankedDocuments:
-    system_message = "You are an expert system that can identify and select relevant arxiv papers that can be used to answer a user query."
-    import streamlit as st
-    rerank_msg = ps.create_rerank_user_prompt(user_question, documents)
-    response = run_instructor_query(system_message, rerank_msg, ps.RerankedDocuments)
-    return response
 
+######################
+## HYBRID RETRIEVAL ##
+######################
 
-def resolve_query(user_question: str, documents: list[Document], response_length: str):
+## Candidates taken from each ranking before fusion, and documents passed on
+## to the reranker.
+HYBRID_CANDIDATES = 50
+RERANK_CANDIDATES = 12
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = RRF_K) -> list:
+    """Fuse ranked lists of ids into one ranking by summed 1 / (k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0) + 1 / (k + rank)
+    return sorted(scores, key=lambda key: (-scores[key], key))
+
+
+def retrieve_documents(
+    user_question: str,
+    criteria: ps.SearchCriteria,
+    config: dict = query_config,
+    k: int = RERANK_CANDIDATES,
+) -> list:
+    """First-stage retrieval for GPT Maestro: the SQL search results (vector
+    distance plus metadata filters) fused with BM25 matches for the question and
+    each semantic query, restricted to the same filters."""
+    documents = {}
+    sql, params = generate_query(criteria, config)
+    for row in db.execute_query(sql, limit=HYBRID_CANDIDATES, params=params):
+        documents.setdefault(row[0], Document(**dict(zip(Document.__fields__.keys(), row))))
+    rankings = [list(documents)]
+
+    lexical_index = bm25.get_index()
+    if lexical_index is not None:
+        queries = [user_question] + (criteria.semantic_search_queries or [])
+        lexical_rankings = [
+            [code for code, _ in lexical_index.search(query, HYBRID_CANDIDATES)]
+            for query in queries
+        ]
+        candidates = {code for ranking in lexical_rankings for code in ranking}
+        candidates -= set(documents)
+        if len(candidates) > 0:
+            lexical_criteria = criteria.model_copy(
+                update={"semantic_search_queries": None}
+            )
+            sql, params = generate_query(lexical_criteria, config, sorted(candidates))
+            for row in db.execute_query(sql, params=params):
+                documents.setdefault(
+                    row[0], Document(**dict(zip(Document.__fields__.keys(), row)))
+                )
+        ## Lexical hits outside the filters are dropped; the per-query lexical
+        ## rankings are fused first so both retrievers weigh the same.
+        lexical_ranking = reciprocal_rank_fusion(lexical_rankings)
+        rankings.append([code for code in lexical_ranking if code in documents])
+
+    return [documents[code] for code in reciprocal_rank_fusion(rankings)[:k]]
+
+
+def resolve_query(
+    user_question: str, documents: list[Document], response_length: str, stream: bool = False
+):
     system_message = "You are an AI academic focused on Large Language Models. Please answer the user query leveraging the information provided in the context."
     user_message = ps.create_resolve_user_prompt(user_question, documents, response_length)
+    if stream:
+        return stream_instructor_query(
+            system_message, user_message, llm_model="claude-3-sonnet-20240229"
+        )
     response = run_instructor_query(system_message, user_message, None, llm_model="claude-3-sonnet-20240229")
     return response
 
 
-def resolve_query_other(user_question: str) -> ps.QueryDecision:
+def resolve_query_other(user_question: str, stream: bool = False):
     """Decide the query action based on the user question."""
     system_message = "You are the GPT Maestro, maintainer of the LLMpedia, a web-based Large Language Model encyclopedia. You received the following unrelated comment from a user via our chat based system. Please respond to it in a friendly, slightly-sarcastic, serious and very concise (less than 20 words) manner."
     user_message = f"{user_question}"
+    if stream:
+        return stream_instructor_query(system_message, user_message)
     response = run_instructor_query(system_message, user_message, None)
     return response
 
 
-def query_llmpedia_new(user_question: str, response_length: str = "Normal") -> tuple:
-    """Extended workflow to query LLMpedia."""
+NO_ANSWER = "Sorry, I don't know about that."
+
+
+def select_documents(user_question: str) -> Optional[list]:
+    """Decide, search and rerank: the documents to answer from, or None if the
+    question is not about LLMs."""
     ## Decide action.
     action = decide_query_action(user_question)
+    if not action.llm_query:
+        return None
 
-    if action.llm_query:
-        ## Create query.
-        query_obj = run_instructor_query(
-            ps.VS_QUERY_SYSTEM_PROMPT,
-            ps.create_query_user_prompt(user_question),
-            ps.SearchCriteria,
-        )
-        print(query_obj)
-        ## Fetch results.
-        sql = generate_query(query_obj, query_config)
-        documents = db.execute_query(sql, limit=20)
-        if len(documents) == 0:
-            return "Sorry, I don't know about that.", []
-        documents = [
-            Document(**dict(zip(Document.__fields__.keys(), d))) for d in documents
-        ]
-        ## Rerank.
-        reranked_documents = rerank_documents_new(user_question, documents)
-        print(reranked_documents)
-        filtered_documents = {
-            k: v for k, v in reranked_documents.documents.items() if v.selected
-        }
-        filtered_documents = [d for d in documents if d.title in filtered_documents]
-        if len(filtered_documents) == 0:
-            return "Sorry, I don't know about that.", []
-        ## Resolve.
-        answer = resolve_query(user_question, filtered_documents, response_length)
-        answer_augment = add_links_to_text_blob(answer)
-        arxiv_codes = extract_arxiv_codes(answer_augment)
-        return answer_augment, arxiv_codes
+    ## Create query.
+    query_obj = run_instructor_query(
+        ps.VS_QUERY_SYSTEM_PROMPT,
+        ps.create_query_user_prompt(user_question),
+        ps.SearchCriteria,
+    )
+    print(query_obj)
+    ## Fetch results.
+    documents = retrieve_documents(user_question, query_obj, query_config)
+    if len(documents) == 0:
+        return []
+    ## Rerank.
+    return rr.get_reranker().select(user_question, documents)
 
-    else:
+
+def answer_question(user_question: str, response_length: str = "Normal") -> tuple:
+    """Extended workflow to query LLMpedia."""
+    documents = select_documents(user_question)
+    if documents is None:
         answer = resolve_query_other(user_question)
         return answer, []
+    if len(documents) == 0:
+        return NO_ANSWER, []
+
+    ## Resolve.
+    answer = resolve_query(user_question, documents, response_length)
+    answer_augment = add_links_to_text_blob(answer)
+    arxiv_codes = extract_arxiv_codes(answer_augment)
+    return answer_augment, arxiv_codes
+
+
+def stream_answer_question(user_question: str, response_length: str = "Normal"):
+    """Streaming `answer_question`: documents are selected before returning,
+    the answer is a stream of text chunks with arxiv links added per span."""
+    documents = select_documents(user_question)
+    if documents is None:
+        return resolve_query_other(user_question, stream=True)
+    if len(documents) == 0:
+        return iter([NO_ANSWER])
+    return transform_stream(resolve_query(user_question, documents, response_length, True))
+
+
+def query_llmpedia_new(user_question: str, response_length: str = "Normal") -> tuple:
+    """Answer a question, reusing the cached answer of a near-identical one."""
+    cached = ac.answer_cache.get(user_question, response_length)
+    if cached is not None:
+        return cached
+    answer, arxiv_codes = answer_question(user_question, response_length)
+    if answer != NO_ANSWER:
+        ac.answer_cache.put(user_question, response_length, answer, arxiv_codes)
+    return answer, arxiv_codes
+
+
+def cache_stream(chunks, user_question: str, response_length: str):
+    """Pass an answer stream through and cache the full answer once it ends."""
+    answer = ""
+    for chunk in chunks:
+        answer += chunk
+        yield chunk
+    if answer != NO_ANSWER:
+        ac.answer_cache.put(
+            user_question, response_length, answer, extract_arxiv_codes(answer)
+        )
+
+
+def query_llmpedia_stream(
+    user_question: str, response_length: str = "Normal", timings: dict = None
+):
+    """Streaming `query_llmpedia_new`: retrieval runs before returning, then the
+    answer is yielded as it is generated. Seconds spent in retrieval, to the
+    first chunk and in total are written to `timings` when given."""
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
+    cached = ac.answer_cache.get(user_question, response_length)
+    if cached is not None:
+        chunks = iter([cached[0]])
+    else:
+        chunks = cache_stream(
+            stream_answer_question(user_question, response_length),
+            user_question,
+            response_length,
+        )
+    timings["retrieval"] = time.perf_counter() - start
+    return time_stream(chunks, timings, start)
@@ -0,0 +1,278 @@
+"""BM25 index over title, abstract and chunk text per paper. GPT Maestro fuses
+its matches with the SQL vector results by reciprocal-rank fusion, which catches
+exact terms (model names, benchmark acronyms) that embeddings miss. Updated
+incrementally at the end of j0_doc_chunker.
+"""
+from collections import Counter
+import numpy as np
+import threading
+import json
+import re
+import os
+
+import utils.ann_index as ann
+import utils.db as db
+
+## Versioned on-disk index (published and pruned like the ANN indexes).
+BM25_INDEX_DIR = os.getenv(
+    "BM25_INDEX_DIR",
+    os.path.join(os.environ.get("PROJECT_PATH", "."), "data", "bm25_index"),
+)
+BM25_INDEX_NAME = "papers"
+BM25_K1 = 1.2
+BM25_B = 0.75
+## Title tokens are counted this many times (cheap field boost).
+TITLE_WEIGHT = 3
+MAX_TOKEN_LENGTH = 40
+## Documents whose postings are collected in Python before packing into arrays.
+BUILD_BATCH_DOCS = 1000
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    (
+        "a an and are as at be by can do does for from has have how in into is it its "
+        "of on or our such that the their these this to via was we were what when "
+        "which while who why will with"
+    ).split()
+)
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens. Hyphenated/dotted terms (e.g. 'gpt-4', 'llama-3.1')
+    are kept whole and also split into their parts."""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if len(token) > MAX_TOKEN_LENGTH or token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "-" in token or "." in token:
+            tokens.extend(
+                part for part in re.split(r"[-.]", token) if part not in STOPWORDS
+            )
+    return tokens
+
+
+def document_tokens(title: str, abstract: str, text: str) -> list:
+    return tokenize(title or "") * TITLE_WEIGHT + tokenize(abstract or "") + tokenize(
+        text or ""
+    )
+
+
+class BM25Index:
+    """Inverted index over papers: per-term postings (doc id, term frequency)
+    stored contiguously by term, scored with Okapi BM25 at query time."""
+
+    def __init__(
+        self, terms, offsets, doc_ids, tfs, doc_lengths, codes, chunked, source_dir=None
+    ):
+        self.source_dir = source_dir
+        self.terms = terms
+        self.vocab = {term: i for i, term in enumerate(terms.tolist())}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.codes = codes
+        ## Whether the paper's chunk text was indexed (else title and abstract only).
+        self.chunked = chunked
+        avg_length = doc_lengths.mean() if len(doc_lengths) else 1.0
+        self.length_norm = (
+            BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / max(avg_length, 1.0))
+        ).astype(np.float32)
+
+    @classmethod
+    def from_postings(cls, terms, term_ids, doc_ids, tfs, doc_lengths, codes, chunked):
+        """Lay out (term, doc, tf) triplets by term."""
+        order = np.argsort(term_ids, kind="stable")
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(term_ids, minlength=len(terms)))
+        return cls(
+            np.asarray(terms, dtype=str),
+            offsets,
+            np.asarray(doc_ids, dtype=np.int32)[order],
+            np.minimum(np.asarray(tfs), np.iinfo(np.uint16).max).astype(np.uint16)[order],
+            np.asarray(doc_lengths, dtype=np.int32),
+            np.asarray(codes, dtype=str),
+            np.asarray(chunked, dtype=bool),
+        )
+
+    @classmethod
+    def build(cls, docs, batch_size: int = BUILD_BATCH_DOCS):
+        """Index an iterable of (arxiv_code, tokens, chunked). Postings are packed
+        into compact arrays every `batch_size` documents."""
+        vocab, codes, lengths, chunked = {}, [], [], []
+        term_ids, doc_ids, tfs = [], [], []
+        batch_terms, batch_doc_ids, batch_tfs = [], [], []
+
+        def pack_batch():
+            term_ids.append(np.asarray(batch_terms, dtype=np.int32))
+            doc_ids.append(np.asarray(batch_doc_ids, dtype=np.int32))
+            tfs.append(
+                np.minimum(batch_tfs, np.iinfo(np.uint16).max).astype(np.uint16)
+            )
+            batch_terms.clear()
+            batch_doc_ids.clear()
+            batch_tfs.clear()
+
+        for doc_id, (code, tokens, has_chunks) in enumerate(docs):
+            counts = Counter(tokens)
+            batch_terms.extend(vocab.setdefault(term, len(vocab)) for term in counts)
+            batch_doc_ids.extend([doc_id] * len(counts))
+            batch_tfs.extend(counts.values())
+            codes.append(code)
+            lengths.append(len(tokens))
+            chunked.append(has_chunks)
+            if (doc_id + 1) % batch_size == 0:
+                pack_batch()
+        pack_batch()
+        return cls.from_postings(
+            list(vocab) or [""],
+            np.concatenate(term_ids),
+            np.concatenate(doc_ids),
+            np.concatenate(tfs),
+            lengths,
+            codes,
+            chunked,
+        )
+
+    def __len__(self):
+        return len(self.codes)
+
+    def postings(self):
+        """All postings as (term_id, doc_id, tf) arrays."""
+        term_ids = np.repeat(
+            np.arange(len(self.terms), dtype=np.int32), np.diff(self.offsets)
+        )
+        return term_ids, np.asarray(self.doc_ids), np.asarray(self.tfs)
+
+    def merge(self, other):
+        """New index with `other`'s papers added (replacing any re-indexed ones)."""
+        keep = ~np.isin(self.codes, other.codes)
+        new_doc_ids = np.cumsum(keep) - 1
+
+        term_ids, doc_ids, tfs = self.postings()
+        kept = keep[doc_ids]
+        term_ids, doc_ids, tfs = term_ids[kept], new_doc_ids[doc_ids[kept]], tfs[kept]
+
+        ## Map the other index's term ids into the combined vocabulary.
+        terms = self.terms.tolist()
+        vocab = dict(self.vocab)
+        other_map = np.array(
+            [vocab.setdefault(term, len(vocab)) for term in other.terms.tolist()],
+            dtype=np.int32,
+        )
+        terms += list(vocab)[len(terms) :]
+        other_terms, other_docs, other_tfs = other.postings()
+        return BM25Index.from_postings(
+            terms,
+            np.concatenate([term_ids, other_map[other_terms]]),
+            np.concatenate([doc_ids, other_docs + keep.sum()]),
+            np.concatenate([tfs, other_tfs]),
+            np.concatenate([self.doc_lengths[keep], other.doc_lengths]),
+            np.concatenate([self.codes[keep], other.codes]),
+            np.concatenate([self.chunked[keep], other.chunked]),
+        )
+
+    def search(self, query: str, k: int = 100) -> list:
+        """Top k papers for a query as [(arxiv_code, bm25_score)], best first."""
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if len(term_ids) == 0 or len(self.codes) == 0:
+            return []
+        n_docs = len(self.codes)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for term_id in term_ids:
+            lo, hi = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[lo:hi]
+            tf = self.tfs[lo:hi].astype(np.float32)
+            idf = np.log(1 + (n_docs - (hi - lo) + 0.5) / (hi - lo + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + self.length_norm[docs])
+
+        top = min(k, int(np.count_nonzero(scores)))
+        if top == 0:
+            return []
+        top_idx = np.argpartition(-scores, top - 1)[:top]
+        top_idx = top_idx[np.argsort(-scores[top_idx], kind="stable")]
+        return [(str(self.codes[i]), float(scores[i])) for i in top_idx]
+
+    def save(self, index_dir: str):
+        """Write the index arrays to a new directory (atomically renamed)."""
+        tmp_dir = index_dir + ".tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        arrays = {
+            "terms": self.terms,
+            "offsets": self.offsets,
+            "doc_ids": self.doc_ids,
+            "tfs": self.tfs,
+            "doc_lengths": self.doc_lengths,
+            "codes": self.codes,
+            "chunked": self.chunked,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.asarray(array))
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(
+                {"size": len(self), "terms": len(self.terms), "postings": len(self.doc_ids)},
+                f,
+            )
+        os.replace(tmp_dir, index_dir)
+        return index_dir
+
+    @classmethod
+    def load(cls, index_dir: str):
+        """Load a saved index (postings memory-mapped)."""
+        arrays = {
+            name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+            for name in ["doc_ids", "tfs"]
+        }
+        for name in ["terms", "offsets", "doc_lengths", "codes", "chunked"]:
+            arrays[name] = np.load(os.path.join(index_dir, f"{name}.npy"))
+        return cls(**arrays, source_dir=index_dir)
+
+
+def fetch_documents(arxiv_codes: list = None):
+    """Stream (arxiv_code, tokens, chunked) for papers from the DB."""
+    for arxiv_code, title, abstract, text in db.iter_paper_texts(arxiv_codes):
+        yield arxiv_code, document_tokens(title, abstract, text), text is not None
+
+
+def build_index(index_dir: str = BM25_INDEX_DIR):
+    """Build the index from scratch and publish it."""
+    index = BM25Index.build(fetch_documents())
+    return ann.publish_index(index, BM25_INDEX_NAME, index_dir)
+
+
+def update_index(index_dir: str = BM25_INDEX_DIR):
+    """Index new papers, and re-index those whose chunks arrived after they were
+    first indexed; publish the merged result."""
+    paths = ann.list_indexes(BM25_INDEX_NAME, index_dir)
+    if len(paths) == 0:
+        return build_index(index_dir)
+    index = BM25Index.load(paths[0])
+    pending = db.get_unindexed_codes(
+        index.codes.tolist(), index.codes[index.chunked].tolist()
+    )
+    if len(pending) == 0:
+        return paths[0]
+    update = BM25Index.build(fetch_documents(pending))
+    if len(update) == 0:
+        return paths[0]
+    return ann.publish_index(index.merge(update), BM25_INDEX_NAME, index_dir)
+
+
+def get_index(index_dir: str = BM25_INDEX_DIR):
+    """Process-wide BM25 index, reloaded when a newer version is published;
+    None if none has been built."""
+    paths = ann.list_indexes(BM25_INDEX_NAME, index_dir)
+    if len(paths) == 0:
+        return None
+    path, index = _loaded.get(index_dir, (None, None))
+    if path != paths[0]:
+        with _load_lock:
+            path, index = _loaded.get(index_dir, (None, None))
+            if path != paths[0]:
+                index = BM25Index.load(paths[0])
+                _loaded[index_dir] = (paths[0], index)
+    return index
@@ -0,0 +1,180 @@
+"""Paper catalog cache for the app.
+
+The workflow publishes versioned Arrow snapshots of the catalog (n0_refresh_catalog).
+A cold start memory-maps the newest one and only reads the DB when none exists.
+`CatalogCache` then merges in rows whose source tables changed since their `tstp`
+watermarks, and reloads everything periodically for sources without one (topics,
+citations, similar documents). Snapshot vs DB load times:
+    python executors/benchmark_catalog_snapshot.py
+"""
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.feather as feather
+import threading
+import glob
+import time
+import os
+import pandas as pd
+
+import utils.db as db
+
+## Watermark used for sources with no rows in the cached frame yet.
+EPOCH = pd.Timestamp("1970-01-01")
+
+## Versioned catalog snapshots (Arrow IPC, uncompressed so they can be memory-mapped).
+SNAPSHOT_DIR = os.getenv(
+    "CATALOG_SNAPSHOT_DIR",
+    os.path.join(os.environ.get("PROJECT_PATH", "."), "data", "catalog_snapshots"),
+)
+SNAPSHOT_KEEP = 5
+## Seconds between full catalog reloads from the DB, which pick up changes to
+## sources without a watermark (topics, citations, similar documents).
+FULL_RELOAD_SECONDS = int(os.getenv("CATALOG_FULL_RELOAD_SECONDS", 6 * 3600))
+
+
+def publish_snapshot(
+    catalog_df: pd.DataFrame = None, snapshot_dir: str = SNAPSHOT_DIR, keep: int = SNAPSHOT_KEEP
+) -> str:
+    """Write a versioned snapshot of the catalog (same columns as the DB rows
+    merged into it) and prune old ones."""
+    if catalog_df is None:
+        catalog_df = db.load_catalog()
+    catalog_df = catalog_df.reset_index()
+    catalog_df["similar_docs"] = catalog_df["similar_docs"].map(
+        lambda x: x if isinstance(x, list) else None
+    )
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    version = datetime.now().strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(snapshot_dir, f"catalog_{version}.arrow")
+    tmp_path = path + ".tmp"
+    table = pa.Table.from_pandas(catalog_df, preserve_index=False)
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+    for old_path in list_snapshots(snapshot_dir)[keep:]:
+        os.remove(old_path)
+    return path
+
+
+def list_snapshots(snapshot_dir: str = SNAPSHOT_DIR) -> list:
+    """Snapshot paths, newest first."""
+    paths = glob.glob(os.path.join(snapshot_dir, "catalog_*.arrow"))
+    return sorted(paths, reverse=True)
+
+
+def load_latest_snapshot(snapshot_dir: str = SNAPSHOT_DIR):
+    """Memory-map the newest snapshot; None if there is none."""
+    paths = list_snapshots(snapshot_dir)
+    if len(paths) == 0:
+        return None
+    with pa.memory_map(paths[0], "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    catalog_df = table.to_pandas()
+    catalog_df["similar_docs"] = catalog_df["similar_docs"].map(
+        lambda x: list(x) if x is not None else None
+    )
+    catalog_df.set_index("arxiv_code", inplace=True)
+    return catalog_df
+
+
+class CatalogCache:
+    """In-process copy of the paper catalog, kept fresh by merging in only
+    the rows whose source tables changed since the last-seen `tstp`, plus a
+    periodic full reload for sources without one."""
+
+    def __init__(
+        self,
+        prepare_fn=None,
+        sort_by: str = "published",
+        full_reload_interval: int = FULL_RELOAD_SECONDS,
+    ):
+        self.prepare_fn = prepare_fn or (lambda df: df)
+        self.sort_by = sort_by
+        self.full_reload_interval = full_reload_interval
+        self.papers_df = None
+        self.watermarks = {}
+        self.last_refresh = None
+        self.last_full_load = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _update_watermarks(self, catalog_df: pd.DataFrame):
+        """Advance the per-source watermarks with the rows just fetched."""
+        for table_name, col in db.CATALOG_TSTP_COLUMNS.items():
+            latest = catalog_df[col].max() if col in catalog_df else None
+            current = self.watermarks.get(table_name, EPOCH)
+            if pd.notna(latest) and latest > current:
+                self.watermarks[table_name] = latest
+            else:
+                self.watermarks[table_name] = current
+
+    def load(self, from_snapshot: bool = True):
+        """Full load of the catalog, from the newest snapshot when available
+        (and allowed) and from the DB otherwise."""
+        catalog_df = load_latest_snapshot() if from_snapshot else None
+        if catalog_df is None:
+            catalog_df = db.load_catalog()
+        papers_df = self.prepare_fn(catalog_df)
+        with self._lock:
+            self.papers_df = papers_df
+            self.watermarks = {}
+            self._update_watermarks(catalog_df)
+            self.last_refresh = time.time()
+            self.last_full_load = self.last_refresh
+        return papers_df
+
+    def refresh(self) -> int:
+        """Fetch rows changed since the watermarks and merge them in. Returns
+        the number of rows merged."""
+        if self.papers_df is None:
+            return len(self.load())
+        delta_df = db.load_catalog(watermarks=dict(self.watermarks))
+        if len(delta_df) > 0:
+            delta_df = self.prepare_fn(delta_df)
+            with self._lock:
+                papers_df = self.papers_df.drop(delta_df.index, errors="ignore")
+                papers_df = pd.concat([papers_df, delta_df])
+                papers_df.sort_values(self.sort_by, ascending=False, inplace=True)
+                self.papers_df = papers_df
+                self._update_watermarks(delta_df)
+        self.last_refresh = time.time()
+        return len(delta_df)
+
+    def get(self) -> pd.DataFrame:
+        """Get a copy of the cached catalog (loading it on first use)."""
+        if self.papers_df is None:
+            with self._lock:
+                needs_load = self.papers_df is None
+            if needs_load:
+                self.load()
+        with self._lock:
+            return self.papers_df.copy()
+
+    def start(self, interval: int = 600):
+        """Refresh in a background thread every `interval` seconds, with a full
+        reload from the DB every `full_reload_interval` seconds."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    full_reload_due = (
+                        self.last_full_load is not None
+                        and time.time() - self.last_full_load >= self.full_reload_interval
+                    )
+                    if full_reload_due:
+                        self.load(from_snapshot=False)
+                    else:
+                        self.refresh()
+                except Exception as e:
+                    print(f"Error refreshing catalog: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
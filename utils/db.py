@@ -1,113 +1,110 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from contextlib import contextmanager
 from datetime import datetime
 import streamlit as st
 import pandas as pd
-import psycopg2
 import uuid
 import os
 
-try:
-    db_params = {
-        "dbname": os.environ["DB_NAME"],
-        "user": os.environ["DB_USER"],
-        "password": os.environ["DB_PASS"],
-        "host": os.environ["DB_HOST"],
-        "port": os.environ["DB_PORT"],
-    }
-except:
-    db_params = {**st.secrets["postgres"]}
+from utils.telemetry import TelemetryWriter
+from utils.db_metrics import instrumented
+from utils.db_backend import (
+    DB_BACKEND,
+    get_backend as _get_backend,
+    list_to_pg_array,
+    params_to_url,
+    vector_literal,
+)
+
+if DB_BACKEND == "duckdb":
+    ## Local embedded database; no server credentials needed.
+    db_params = {}
+else:
+    try:
+        db_params = {
+            "dbname": os.environ["DB_NAME"],
+            "user": os.environ["DB_USER"],
+            "password": os.environ["DB_PASS"],
+            "host": os.environ["DB_HOST"],
+            "port": os.environ["DB_PORT"],
+        }
+    except:
+        db_params = {**st.secrets["postgres"]}
+
+
+def get_backend(params: dict = None):
+    """Get the active database backend (Postgres, or DuckDB if DB_BACKEND=duckdb)."""
+    return _get_backend(params or db_params)
 
 
-database_url = f"postgresql+psycopg2://{db_params['user']}:{db_params['password']}@{db_params['host']}:{db_params['port']}/{db_params['dbname']}"
+database_url = get_backend().url
 
 
-def list_to_pg_array(lst):
-    return "{" + ",".join(lst) + "}"
+def get_engine(params: dict = None):
+    """Get the process-wide pooled SQLAlchemy engine (created on first use)."""
+    return get_backend(params).engine
+
+
+@contextmanager
+def pg_connection(params: dict = None):
+    """Borrow a pooled DB-API connection; commit on success, rollback on error."""
+    with get_backend(params).connection() as conn:
+        yield conn
 
 
 def pg_array_to_list(array_str):
     return array_str.strip("{}").split(",")
 
 
+@instrumented
+def insert_log_rows(table_name: str, rows: list):
+    """Insert a batch of log rows with a single multi-row INSERT."""
+    get_backend().insert_rows(table_name, rows)
+    return True
+
+
+telemetry = TelemetryWriter(insert_log_rows)
+
+
 def log_error_db(error):
     """Log error in DB along with streamlit app state."""
-    engine = create_engine(database_url)
-    with engine.begin() as conn:
-        error_id = str(uuid.uuid4())
-        tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
-        query = text(
-            """
-            INSERT INTO error_logs (error_id, tstp, error)
-            VALUES (:error_id, :tstp, :error);
-        """
-        )
-        conn.execute(
-            query,
-            {
-                "error_id": str(error_id),
-                "tstp": tstp,
-                "error": str(error),
-            },
-        )
+    tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
+    telemetry.log(
+        "error_logs",
+        {"error_id": str(uuid.uuid4()), "tstp": tstp, "error": str(error)},
+    )
     return True
 
 
 def log_qna_db(user_question, response):
     """Log Q&A in DB along with streamlit app state."""
-    try:
-        engine = create_engine(database_url)
-        with engine.begin() as conn:
-            qna_id = str(uuid.uuid4())
-            tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
-            query = text(
-                """
-                INSERT INTO qna_logs (qna_id, tstp, user_question, response)
-                VALUES (:qna_id, :tstp, :user_question, :response);
-            """
-            )
-            conn.execute(
-                query,
-                {
-                    "qna_id": str(qna_id),
-                    "tstp": tstp,
-                    "user_question": str(user_question),
-                    "response": str(response),
-                },
-            )
-    except Exception as e:
-        print(f"Error in logging Q&A: {e}")
+    tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
+    telemetry.log(
+        "qna_logs",
+        {
+            "qna_id": str(uuid.uuid4()),
+            "tstp": tstp,
+            "user_question": str(user_question),
+            "response": str(response),
+        },
+    )
     return True
 
 
 def log_visit(entrypoint: str):
     """Log user visit in DB."""
-    try:
-        engine = create_engine(database_url)
-        with engine.begin() as conn:
-            visit_id = str(uuid.uuid4())
-            tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
-            query = text(
-                """
-                INSERT INTO visit_logs (visit_id, tstp, entrypoint)
-                VALUES (:visit_id, :tstp, :entrypoint);
-            """
-            )
-            conn.execute(
-                query,
-                {
-                    "visit_id": str(visit_id),
-                    "tstp": tstp,
-                    "entrypoint": str(entrypoint),
-                },
-            )
-    except Exception as e:
-        print(f"Error in logging visit: {e}")
+    tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
+    telemetry.log(
+        "visit_logs",
+        {"visit_id": str(uuid.uuid4()), "tstp": tstp, "entrypoint": str(entrypoint)},
+    )
     return True
 
 
+@instrumented
 def report_issue(arxiv_code, issue_type):
     """Report an issue in DB."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         issue_id = str(uuid.uuid4())
         tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
@@ -130,9 +127,10 @@ def report_issue(arxiv_code, issue_type):
     return True
 
 
+@instrumented
 def get_reported_non_llm_papers():
     """Get a list of non-LLM papers reported by users."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             """
@@ -148,9 +146,10 @@ def get_reported_non_llm_papers():
     return reported_papers
 
 
+@instrumented
 def update_reported_status(arxiv_code, issue_type, resolved=True):
     """Update user-reported issue status in DB (resolved or not)."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             """
@@ -167,9 +166,10 @@ def update_reported_status(arxiv_code, issue_type, resolved=True):
     return True
 
 
+@instrumented
 def insert_recursive_summary(arxiv_code, summary):
     """Insert data into recursive_summary table in DB."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             """
@@ -184,9 +184,10 @@ def insert_recursive_summary(arxiv_code, summary):
     return True
 
 
+@instrumented
 def insert_bullet_list_summary(arxiv_code, summary):
     """Insert data into bullet_list_summaries table in DB."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             """
@@ -201,181 +202,433 @@ def insert_bullet_list_summary(arxiv_code, summary):
     return True
 
 
-def load_arxiv(arxiv_code: str = None):
+STREAM_CHUNKSIZE = int(os.getenv("DB_STREAM_CHUNKSIZE", 5000))
+
+
+@instrumented
+def stream_query(
+    query: str, params: dict = None, chunksize: int = STREAM_CHUNKSIZE, as_arrow=False
+):
+    """Stream a query through a named server-side cursor, yielding DataFrames
+    (or Arrow record batches) of at most `chunksize` rows."""
+    with get_engine().connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+        chunks = pd.read_sql(text(query), conn, params=params, chunksize=chunksize)
+        for chunk_df in chunks:
+            if as_arrow:
+                import pyarrow as pa
+
+                yield pa.RecordBatch.from_pandas(chunk_df, preserve_index=False)
+            else:
+                yield chunk_df
+
+
+def read_frame(query: str, prep_fn, params: dict = None, chunksize: int = None):
+    """Read a query in streamed chunks, applying `prep_fn` to each. Returns the
+    combined DataFrame, or an iterator of prepared chunks if `chunksize` is set."""
+    chunks = (
+        prep_fn(chunk_df)
+        for chunk_df in stream_query(query, params, chunksize or STREAM_CHUNKSIZE)
+    )
+    if chunksize:
+        return chunks
+    return pd.concat(chunks)
+
+
+@instrumented
+def load_arxiv(arxiv_code: str = None, chunksize: int = None):
     query = "SELECT * FROM arxiv_details"
     if arxiv_code:
-        query += f" WHERE arxiv_code = '{arxiv_code}'"
-    conn = create_engine(database_url)
-    arxiv_df = pd.read_sql(query, conn)
-    arxiv_df.set_index("arxiv_code", inplace=True)
-    return arxiv_df
+        query += " WHERE arxiv_code = :arxiv_code"
+
+    def prep(arxiv_df):
+        arxiv_df.set_index("arxiv_code", inplace=True)
+        return arxiv_df
 
+    params = {"arxiv_code": arxiv_code} if arxiv_code else None
+    return read_frame(query, prep, params, chunksize)
 
-def load_summaries():
+
+@instrumented
+def load_summaries(chunksize: int = None):
     query = "SELECT * FROM summaries;"
-    conn = create_engine(database_url)
-    summaries_df = pd.read_sql(query, conn)
-    summaries_df.set_index("arxiv_code", inplace=True)
-    summaries_df.drop(columns=["tstp"], inplace=True)
-    return summaries_df
 
+    def prep(summaries_df):
+        summaries_df.set_index("arxiv_code", inplace=True)
+        summaries_df.drop(columns=["tstp"], inplace=True)
+        return summaries_df
+
+    return read_frame(query, prep, chunksize=chunksize)
 
-def load_recursive_summaries():
+
+@instrumented
+def load_recursive_summaries(chunksize: int = None):
     query = "SELECT * FROM recursive_summaries;"
-    conn = create_engine(database_url)
-    recursive_summaries_df = pd.read_sql(query, conn)
-    recursive_summaries_df.set_index("arxiv_code", inplace=True)
-    recursive_summaries_df.rename(
-        columns={"summary": "recursive_summary"}, inplace=True
-    )
-    recursive_summaries_df.drop(columns=["tstp"], inplace=True)
-    return recursive_summaries_df
+
+    def prep(recursive_summaries_df):
+        recursive_summaries_df.set_index("arxiv_code", inplace=True)
+        recursive_summaries_df.rename(
+            columns={"summary": "recursive_summary"}, inplace=True
+        )
+        recursive_summaries_df.drop(columns=["tstp"], inplace=True)
+        return recursive_summaries_df
+
+    return read_frame(query, prep, chunksize=chunksize)
 
 
-def load_bullet_list_summaries():
+@instrumented
+def load_bullet_list_summaries(chunksize: int = None):
     query = "SELECT * FROM bullet_list_summaries;"
-    conn = create_engine(database_url)
-    bullet_list_summaries_df = pd.read_sql(query, conn)
-    bullet_list_summaries_df.set_index("arxiv_code", inplace=True)
-    bullet_list_summaries_df.rename(columns={"summary": "bullet_list_summary"}, inplace=True)
-    bullet_list_summaries_df.drop(columns=["tstp"], inplace=True)
-    return bullet_list_summaries_df
 
+    def prep(bullet_list_summaries_df):
+        bullet_list_summaries_df.set_index("arxiv_code", inplace=True)
+        bullet_list_summaries_df.rename(columns={"summary": "bullet_list_summary"}, inplace=True)
+        bullet_list_summaries_df.drop(columns=["tstp"], inplace=True)
+        return bullet_list_summaries_df
 
-def load_summary_notes():
+    return read_frame(query, prep, chunksize=chunksize)
+
+
+@instrumented
+def load_summary_notes(chunksize: int = None):
     query = "SELECT * FROM summary_notes;"
-    conn = create_engine(database_url)
-    extended_summaries_df = pd.read_sql(query, conn)
-    extended_summaries_df.set_index("arxiv_code", inplace=True)
-    return extended_summaries_df
 
+    def prep(extended_summaries_df):
+        extended_summaries_df.set_index("arxiv_code", inplace=True)
+        return extended_summaries_df
+
+    return read_frame(query, prep, chunksize=chunksize)
 
-def load_summary_markdown():
+
+@instrumented
+def load_summary_markdown(chunksize: int = None):
     query = "SELECT * FROM summary_markdown;"
-    conn = create_engine(database_url)
-    markdown_summaries_df = pd.read_sql(query, conn)
-    markdown_summaries_df.set_index("arxiv_code", inplace=True)
-    markdown_summaries_df.rename(columns={"summary": "markdown_notes"}, inplace=True)
-    markdown_summaries_df.drop(columns=["tstp"], inplace=True)
-    return markdown_summaries_df
 
+    def prep(markdown_summaries_df):
+        markdown_summaries_df.set_index("arxiv_code", inplace=True)
+        markdown_summaries_df.rename(columns={"summary": "markdown_notes"}, inplace=True)
+        markdown_summaries_df.drop(columns=["tstp"], inplace=True)
+        return markdown_summaries_df
+
+    return read_frame(query, prep, chunksize=chunksize)
 
-def load_topics():
+
+@instrumented
+def load_topics(chunksize: int = None):
     query = "SELECT * FROM topics;"
-    conn = create_engine(database_url)
-    topics_df = pd.read_sql(query, conn)
-    topics_df.set_index("arxiv_code", inplace=True)
-    return topics_df
+
+    def prep(topics_df):
+        topics_df.set_index("arxiv_code", inplace=True)
+        return topics_df
+
+    return read_frame(query, prep, chunksize=chunksize)
 
 
-def load_similar_documents():
+@instrumented
+def load_similar_documents(chunksize: int = None):
     query = "SELECT * FROM similar_documents;"
-    conn = create_engine(database_url)
-    similar_docs_df = pd.read_sql(query, conn)
-    similar_docs_df.set_index("arxiv_code", inplace=True)
-    similar_docs_df["similar_docs"] = similar_docs_df["similar_docs"].apply(
-        pg_array_to_list
-    )
-    return similar_docs_df
+
+    def prep(similar_docs_df):
+        similar_docs_df.set_index("arxiv_code", inplace=True)
+        similar_docs_df["similar_docs"] = similar_docs_df["similar_docs"].apply(
+            pg_array_to_list
+        )
+        return similar_docs_df
+
+    return read_frame(query, prep, chunksize=chunksize)
 
 
-def load_citations(arxiv_code=None):
+@instrumented
+def load_citations(arxiv_code=None, chunksize: int = None):
     query = "SELECT * FROM semantic_details"
     if arxiv_code:
-        query += f" WHERE arxiv_code = '{arxiv_code}';"
-    conn = create_engine(database_url)
-    citations_df = pd.read_sql(query, conn)
-    citations_df.set_index("arxiv_code", inplace=True)
-    citations_df.drop(columns=["paper_id"], inplace=True)
-    return citations_df
+        query += " WHERE arxiv_code = :arxiv_code"
+
+    def prep(citations_df):
+        citations_df.set_index("arxiv_code", inplace=True)
+        citations_df.drop(columns=["paper_id"], inplace=True)
+        return citations_df
 
+    params = {"arxiv_code": arxiv_code} if arxiv_code else None
+    return read_frame(query, prep, params, chunksize)
 
-def load_tweet_insights(arxiv_code=None):
-    query = "SELECT * FROM tweet_reviews where tweet_type = 'insight_v1'"
+
+@instrumented
+def load_tweet_insights(arxiv_code=None, chunksize: int = None):
+    query = "SELECT * FROM tweet_reviews WHERE tweet_type = 'insight_v1'"
     if arxiv_code:
-        query += f" WHERE arxiv_code = '{arxiv_code}';"
-    conn = create_engine(database_url)
-    tweet_reviews_df = pd.read_sql(query, conn)
-    tweet_reviews_df.set_index("arxiv_code", inplace=True)
-    tweet_reviews_df.drop(columns=["tstp", "rejected", "tweet_type"], inplace=True)
-    tweet_reviews_df.rename(columns={"review": "tweet_insight"}, inplace=True)
-    return tweet_reviews_df
+        query += " AND arxiv_code = :arxiv_code"
+
+    def prep(tweet_reviews_df):
+        tweet_reviews_df.set_index("arxiv_code", inplace=True)
+        tweet_reviews_df.drop(columns=["tstp", "rejected", "tweet_type"], inplace=True)
+        tweet_reviews_df.rename(columns={"review": "tweet_insight"}, inplace=True)
+        return tweet_reviews_df
+
+    params = {"arxiv_code": arxiv_code} if arxiv_code else None
+    return read_frame(query, prep, params, chunksize)
+
+
+CATALOG_SELECT_SQL = """
+SELECT DISTINCT ON (s.arxiv_code)
+    s.arxiv_code,
+    s.contribution_title, s.contribution_content,
+    s.takeaway_title, s.takeaway_content, s.takeaway_example,
+    s.category,
+    s.novelty_score, s.novelty_analysis,
+    s.technical_score, s.technical_analysis,
+    s.enjoyable_score, s.enjoyable_analysis,
+    a.updated, a.published, a.title, a.summary, a.authors, a.arxiv_comment, a.tstp,
+    t.topic, t.dim1, t.dim2,
+    c.venue, c.tldr, c.citation_count, c.influential_citation_count,
+    r.summary AS recursive_summary,
+    b.summary AS bullet_list_summary,
+    m.summary AS markdown_notes,
+    tw.review AS tweet_insight,
+    sd.similar_docs,
+    s.tstp AS summaries_tstp,
+    r.tstp AS recursive_summaries_tstp,
+    b.tstp AS bullet_list_summaries_tstp,
+    m.tstp AS summary_markdown_tstp,
+    tw.tstp AS tweet_reviews_tstp
+FROM summaries s
+LEFT JOIN arxiv_details a ON a.arxiv_code = s.arxiv_code
+LEFT JOIN topics t ON t.arxiv_code = s.arxiv_code
+LEFT JOIN semantic_details c ON c.arxiv_code = s.arxiv_code
+LEFT JOIN recursive_summaries r ON r.arxiv_code = s.arxiv_code
+LEFT JOIN bullet_list_summaries b ON b.arxiv_code = s.arxiv_code
+LEFT JOIN summary_markdown m ON m.arxiv_code = s.arxiv_code
+LEFT JOIN tweet_reviews tw ON tw.arxiv_code = s.arxiv_code AND tw.tweet_type = 'insight_v1'
+LEFT JOIN similar_documents sd ON sd.arxiv_code = s.arxiv_code
+ORDER BY s.arxiv_code, s.tstp DESC, r.tstp DESC, b.tstp DESC, m.tstp DESC, tw.tstp DESC
+"""
+
+CATALOG_VIEW_SQL = (
+    f"CREATE MATERIALIZED VIEW IF NOT EXISTS paper_catalog AS {CATALOG_SELECT_SQL};"
+)
+
+
+## Per-source watermark columns exposed by the catalog (source table -> column).
+## topics, semantic_details and similar_documents have no timestamp, so their
+## changes only arrive with a full catalog reload.
+CATALOG_TSTP_COLUMNS = {
+    "arxiv_details": "tstp",
+    "summaries": "summaries_tstp",
+    "recursive_summaries": "recursive_summaries_tstp",
+    "bullet_list_summaries": "bullet_list_summaries_tstp",
+    "summary_markdown": "summary_markdown_tstp",
+    "tweet_reviews": "tweet_reviews_tstp",
+}
+## Columns added to the catalog after its first definition (older views are rebuilt).
+CATALOG_REQUIRED_COLUMNS = list(CATALOG_TSTP_COLUMNS.values())
+
+
+@instrumented
+def get_catalog_columns(db_params=db_params):
+    """Get the column names of the paper catalog (empty if it does not exist)."""
+    return get_backend(db_params).table_columns("paper_catalog")
+
+
+@instrumented
+def create_catalog_view(db_params=db_params):
+    """Create the pre-joined paper catalog (materialized view) if missing,
+    rebuilding it when its definition predates the current columns. Backends
+    without materialized views get a plain table rebuilt on every call."""
+    if not get_backend(db_params).supports_materialized_views:
+        execute_statement(
+            f"CREATE OR REPLACE TABLE paper_catalog AS {CATALOG_SELECT_SQL};", db_params
+        )
+        return True
+    existing_columns = get_catalog_columns(db_params)
+    if existing_columns and not set(CATALOG_REQUIRED_COLUMNS) <= set(existing_columns):
+        execute_statement("DROP MATERIALIZED VIEW paper_catalog;", db_params)
+    execute_statement(CATALOG_VIEW_SQL, db_params)
+    execute_statement(
+        "CREATE UNIQUE INDEX IF NOT EXISTS paper_catalog_arxiv_code_idx "
+        "ON paper_catalog (arxiv_code);",
+        db_params,
+    )
+    return True
+
 
+@instrumented
+def refresh_catalog(db_params=db_params):
+    """Refresh the paper catalog without blocking readers."""
+    create_catalog_view(db_params)
+    if not get_backend(db_params).supports_materialized_views:
+        return True
+    execute_statement("REFRESH MATERIALIZED VIEW CONCURRENTLY paper_catalog;", db_params)
+    return True
 
-def get_arxiv_parent_chunk_ids(chunk_ids: list):
+
+@instrumented
+def load_catalog(watermarks: dict = None, chunksize: int = None):
+    """Load the pre-joined paper catalog in one streamed query. If `watermarks`
+    ({source_table: tstp}) is given, only rows added or changed after them are returned."""
+    query = "SELECT * FROM paper_catalog"
+    params = {}
+    if watermarks:
+        conditions = []
+        for table_name, tstp in watermarks.items():
+            col = CATALOG_TSTP_COLUMNS[table_name]
+            conditions.append(f"{col} > :{col}")
+            params[col] = tstp
+        query += " WHERE " + " OR ".join(conditions)
+
+    def prep(catalog_df):
+        catalog_df.set_index("arxiv_code", inplace=True)
+        catalog_df["similar_docs"] = catalog_df["similar_docs"].map(
+            lambda x: pg_array_to_list(x) if isinstance(x, str) else x
+        )
+        return catalog_df
+
+    return read_frame(query, prep, params, chunksize)
+
+
+@instrumented
+def get_arxiv_parent_chunk_ids(chunk_ids: list, version: str = "10000_1000"):
     """Get (arxiv_code, parent_id) for a list of (arxiv_code, child_id) tuples."""
-    ## ToDo: Improve version param.
-    engine = create_engine(database_url)
+    if len(chunk_ids) == 0:
+        return []
+    codes, ids = map(list, zip(*chunk_ids))
+    engine = get_engine()
     with engine.begin() as conn:
-        # Prepare a list of conditions for matching pairs of arxiv_code and child_id
-        conditions = " OR ".join(
-            [
-                f"(arxiv_code = '{arxiv_code}' AND child_id = {child_id})"
-                for arxiv_code, child_id in chunk_ids
-            ]
-        )
         query = text(
-            f"""
-            SELECT DISTINCT arxiv_code, parent_id
-            FROM arxiv_chunk_map
-            WHERE ({conditions})
-            AND version = '10000_1000';
---             AND version = '5000_500';
+            """
+            SELECT DISTINCT m.arxiv_code, m.parent_id
+            FROM (
+                SELECT unnest(CAST(:codes AS text[])) AS arxiv_code,
+                       unnest(CAST(:ids AS int[])) AS child_id
+            ) k
+            JOIN arxiv_chunk_map m
+              ON m.arxiv_code = k.arxiv_code
+             AND m.child_id = k.child_id
+            WHERE m.version = :version;
             """
         )
-        result = conn.execute(query)
+        result = conn.execute(query, {"codes": codes, "ids": ids, "version": version})
         parent_ids = result.fetchall()
     return parent_ids
 
 
+@instrumented
 def get_arxiv_chunks(chunk_ids: list, source="child"):
     """Get chunks with metadata for a list of (arxiv_code, chunk_id) tuples."""
-    engine = create_engine(database_url)
+    if len(chunk_ids) == 0:
+        return pd.DataFrame()
+    codes, ids = map(list, zip(*chunk_ids))
+    engine = get_engine()
     source_table = "arxiv_chunks" if source == "child" else "arxiv_parent_chunks"
     with engine.begin() as conn:
-        # Prepare a list of conditions for matching pairs of arxiv_code and chunk_id
-        conditions = " OR ".join(
-            [
-                f"(p.arxiv_code = '{arxiv_code}' AND p.chunk_id = {chunk_id})"
-                for arxiv_code, chunk_id in chunk_ids
-            ]
-        )
         query = text(
             f"""
             SELECT d.arxiv_code, d.title, d.published, s.citation_count, p.text
-            FROM {source_table} p , arxiv_details d, semantic_details s
-            WHERE p.arxiv_code = d.arxiv_code
-            AND p.arxiv_code = s.arxiv_code
-            AND ({conditions});
+            FROM (
+                SELECT unnest(CAST(:codes AS text[])) AS arxiv_code,
+                       unnest(CAST(:ids AS int[])) AS chunk_id
+            ) k
+            JOIN {source_table} p ON p.arxiv_code = k.arxiv_code AND p.chunk_id = k.chunk_id
+            JOIN arxiv_details d ON p.arxiv_code = d.arxiv_code
+            JOIN semantic_details s ON p.arxiv_code = s.arxiv_code;
             """
         )
-        result = conn.execute(query)
+        result = conn.execute(query, {"codes": codes, "ids": ids})
         chunks = result.fetchall()
         chunks_df = pd.DataFrame(chunks)
     return chunks_df
 
 
-def execute_query(query, db_params=db_params, limit=None):
-    """Upload a dictionary to a database."""
-    if limit and "LIMIT" not in query:
-        query = query.strip().rstrip(";") + f" LIMIT {limit};"
-    with psycopg2.connect(**db_params) as conn:
+@instrumented
+def get_arxiv_parent_chunks(
+    child_ids: list,
+    version: str = "10000_1000",
+    parent_table: str = "arxiv_parent_chunks",
+):
+    """Get parent chunks with metadata for a list of (arxiv_code, child_id) tuples
+    in a single round trip (child -> parent mapping + chunk text + metadata)."""
+    if len(child_ids) == 0:
+        return pd.DataFrame()
+    codes, ids = map(list, zip(*child_ids))
+    engine = get_engine()
+    with engine.begin() as conn:
+        query = text(
+            f"""
+            WITH parents AS (
+                SELECT DISTINCT m.arxiv_code, m.parent_id
+                FROM (
+                    SELECT unnest(CAST(:codes AS text[])) AS arxiv_code,
+                           unnest(CAST(:ids AS int[])) AS child_id
+                ) k
+                JOIN arxiv_chunk_map m
+                  ON m.arxiv_code = k.arxiv_code
+                 AND m.child_id = k.child_id
+                WHERE m.version = :version
+            )
+            SELECT d.arxiv_code, d.title, d.published, s.citation_count, p.text
+            FROM parents pr
+            JOIN {parent_table} p ON p.arxiv_code = pr.arxiv_code AND p.chunk_id = pr.parent_id
+            JOIN arxiv_details d ON p.arxiv_code = d.arxiv_code
+            JOIN semantic_details s ON p.arxiv_code = s.arxiv_code;
+            """
+        )
+        result = conn.execute(query, {"codes": codes, "ids": ids, "version": version})
+        chunks_df = pd.DataFrame(result.fetchall())
+    return chunks_df
+
+
+@instrumented
+def execute_query(query, db_params=db_params, limit=None, params=None):
+    """Run a query (with optional bound `params`) and fetch all rows. A `limit`
+    is bound as a trailing LIMIT, so the query must not end with its own."""
+    if limit:
+        query = query.strip().rstrip(";") + " LIMIT %(limit)s;"
+        params = {**(params or {}), "limit": int(limit)}
+    with pg_connection(db_params) as conn:
         with conn.cursor() as cur:
-            cur.execute(query)
+            cur.execute(query, params)
             return cur.fetchall()
 
 
+@instrumented
+def execute_statement(statement: str, db_params=db_params):
+    """Execute a statement that returns no rows (DDL, maintenance)."""
+    with pg_connection(db_params) as conn:
+        with conn.cursor() as cur:
+            cur.execute(statement)
+    return True
+
+
+@instrumented
+def execute_autocommit(statement: str, db_params=db_params):
+    """Execute a statement outside any transaction (e.g. CREATE INDEX CONCURRENTLY)."""
+    with pg_connection(db_params) as conn:
+        ## Close the transaction a pool pre-ping may have opened.
+        conn.rollback()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute(statement)
+        finally:
+            conn.autocommit = False
+    return True
+
+
+@instrumented
 def check_in_db(arxiv_code, db_params, table_name):
     """Check if an arxiv code is in the database."""
-    with psycopg2.connect(**db_params) as conn:
+    with pg_connection(db_params) as conn:
         with conn.cursor() as cur:
-            cur.execute(f"SELECT * FROM {table_name} WHERE arxiv_code = '{arxiv_code}'")
-            return bool(cur.rowcount)
+            cur.execute(
+                f"SELECT 1 FROM {table_name} WHERE arxiv_code = %(arxiv_code)s LIMIT 1",
+                {"arxiv_code": arxiv_code},
+            )
+            return cur.fetchone() is not None
 
 
+@instrumented
 def upload_to_db(data, db_params, table_name):
     """Upload a dictionary to a database."""
-    with psycopg2.connect(**db_params) as conn:
+    with pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             columns = ", ".join(data.keys())
             placeholders = ", ".join(["%s"] * len(data))
@@ -385,85 +638,279 @@ def upload_to_db(data, db_params, table_name):
             )
 
 
+@instrumented
 def remove_from_db(arxiv_code, db_params, table_name):
     """Remove an entry from the database."""
-    with psycopg2.connect(**db_params) as conn:
+    with pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(f"DELETE FROM {table_name} WHERE arxiv_code = '{arxiv_code}'")
 
 
-def upload_df_to_db(
-    df: pd.DataFrame, table_name: str, params: dict, if_exists: str = "append"
+@instrumented
+def copy_df_to_db(
+    df: pd.DataFrame,
+    table_name: str,
+    params: dict = None,
+    if_exists: str = "append",
+    upsert_keys: list = None,
+    batch_size: int = 5000,
 ):
-    """Upload a dataframe to a database."""
-    db_url = (
-        f"postgresql+psycopg2://{params['user']}:{params['password']}"
-        f"@{params['host']}:{params['port']}/{params['dbname']}"
-    )
-    engine = create_engine(db_url)
-    df.to_sql(
-        table_name,
-        engine,
-        if_exists=if_exists,
-        index=False,
-        method="multi",
-        chunksize=10,
+    """Bulk load a dataframe (COPY FROM STDIN on Postgres). With `upsert_keys`,
+    existing rows matching those keys are replaced."""
+    get_backend(params).bulk_load(
+        df, table_name, if_exists=if_exists, upsert_keys=upsert_keys, batch_size=batch_size
     )
+    return True
 
-    ## Commit.
-    with psycopg2.connect(**params) as conn:
-        with conn.cursor() as cur:
-            cur.execute("COMMIT")
 
-    ## Close.
-    engine.dispose()
+@instrumented
+def upload_df_to_db(
+    df: pd.DataFrame,
+    table_name: str,
+    params: dict,
+    if_exists: str = "append",
+    upsert_keys: list = None,
+    method: str = "copy",
+):
+    """Upload a dataframe to a database (COPY by default, multi-row INSERT otherwise)."""
+    if method == "copy":
+        return copy_df_to_db(
+            df, table_name, params, if_exists=if_exists, upsert_keys=upsert_keys
+        )
 
+    engine = get_engine(params)
+    with engine.begin() as conn:
+        df.to_sql(
+            table_name,
+            conn,
+            if_exists=if_exists,
+            index=False,
+            method="multi",
+            chunksize=10,
+        )
     return True
 
 
+@instrumented
 def get_arxiv_id_list(db_params=db_params, table_name="arxiv_details"):
     """Get a list of all arxiv codes in the database."""
-    with psycopg2.connect(**db_params) as conn:
+    with pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(f"SELECT DISTINCT arxiv_code FROM {table_name}")
             return [row[0] for row in cur.fetchall()]
 
 
+def collection_filter(collection_name: str) -> str:
+    """Target filter restricting `langchain_pg_embedding` rows to a collection."""
+    return (
+        "t.collection_id = (SELECT uuid FROM langchain_pg_collection "
+        f"WHERE name = '{collection_name}')"
+    )
+
+
+_collection_uuids = {}
+
+
+@instrumented
+def get_collection_uuid(collection_name: str, db_params=db_params):
+    """Get the UUID of a vector store collection by name (None if missing)."""
+    if collection_name not in _collection_uuids:
+        rows = execute_query(
+            "SELECT uuid FROM langchain_pg_collection WHERE name = %(name)s;",
+            db_params,
+            params={"name": collection_name},
+        )
+        if len(rows) == 0:
+            return None
+        _collection_uuids[collection_name] = str(rows[0][0])
+    return _collection_uuids[collection_name]
+
+
+@instrumented
+def iter_pending_codes(
+    source,
+    target_table: str,
+    extra_filters: str = "",
+    target_key: str = "t.arxiv_code",
+    limit: int = None,
+    db_params=db_params,
+    itersize: int = 1000,
+):
+    """Stream arxiv codes present in `source` but missing from `target_table`,
+    newest first. `source` is a table name or a list of codes; `extra_filters`
+    is a SQL condition on the target rows (aliased `t`)."""
+    params = {}
+    if isinstance(source, str):
+        source_sql = f"(SELECT DISTINCT arxiv_code FROM {source})"
+    else:
+        source_sql = "(SELECT DISTINCT unnest(%(codes)s::text[]) AS arxiv_code)"
+        params["codes"] = list(source)
+    extra_filters = f"AND {extra_filters}" if extra_filters else ""
+    query = f"""
+        SELECT s.arxiv_code
+        FROM {source_sql} s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {target_table} t
+            WHERE ({target_key}) = s.arxiv_code
+            {extra_filters}
+        )
+        ORDER BY s.arxiv_code DESC
+    """
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    with pg_connection(db_params) as conn:
+        with conn.cursor(name="pending_codes") as cur:
+            cur.itersize = itersize
+            cur.execute(query, params)
+            for row in cur:
+                yield row[0]
+
+
+def get_pending_codes(
+    source,
+    target_table: str,
+    extra_filters: str = "",
+    target_key: str = "t.arxiv_code",
+    limit: int = None,
+    db_params=db_params,
+):
+    """Get arxiv codes pending processing (in `source`, not in `target_table`)."""
+    return list(
+        iter_pending_codes(
+            source,
+            target_table,
+            extra_filters=extra_filters,
+            target_key=target_key,
+            limit=limit,
+            db_params=db_params,
+        )
+    )
+
+
+@instrumented
+def get_unindexed_codes(indexed_codes: list, chunked_codes: list, db_params=db_params):
+    """Papers missing from an external index (`indexed_codes`), or chunked since
+    they were indexed (not in `chunked_codes` but present in arxiv_chunks)."""
+    query = """
+        SELECT d.arxiv_code
+        FROM arxiv_details d
+        WHERE NOT EXISTS (
+            SELECT 1 FROM unnest(%(indexed)s::text[]) i(arxiv_code)
+            WHERE i.arxiv_code = d.arxiv_code
+        )
+        OR (
+            EXISTS (SELECT 1 FROM arxiv_chunks c WHERE c.arxiv_code = d.arxiv_code)
+            AND NOT EXISTS (
+                SELECT 1 FROM unnest(%(chunked)s::text[]) k(arxiv_code)
+                WHERE k.arxiv_code = d.arxiv_code
+            )
+        )
+        ORDER BY d.arxiv_code DESC
+    """
+    params = {"indexed": list(indexed_codes), "chunked": list(chunked_codes)}
+    with pg_connection(db_params) as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            return [row[0] for row in cur.fetchall()]
+
+
+@instrumented
 def get_latest_tstp(
     db_params=db_params, table_name="arxiv_details", extra_condition=""
 ):
     """Get the latest timestamp in the database."""
-    with psycopg2.connect(**db_params) as conn:
+    with pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(f"SELECT MAX(tstp) FROM {table_name} {extra_condition};")
             return cur.fetchone()[0]
 
 
+@instrumented
 def get_max_table_date(db_params, table_name, date_col="date"):
     """Get the max date in a table."""
-    with psycopg2.connect(**db_params) as conn:
+    with pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(f"SELECT MAX({date_col}) FROM {table_name};")
             return cur.fetchone()[0]
 
 
+@instrumented
 def get_arxiv_id_embeddings(collection_name, db_params=db_params):
-    with psycopg2.connect(**db_params) as conn:
+    with pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 f"""
-                SELECT DISTINCT a.cmetadata->>'arxiv_code' AS arxiv_code
+                SELECT DISTINCT (a.cmetadata->>'arxiv_code') AS arxiv_code
                 FROM langchain_pg_embedding a, langchain_pg_collection b
                 WHERE a.collection_id = b.uuid
                 AND b.name = '{collection_name}'
-                AND a.cmetadata->>'arxiv_code' IS NOT NULL;"""
+                AND (a.cmetadata->>'arxiv_code') IS NOT NULL;"""
             )
             return [row[0] for row in cur.fetchall()]
 
 
+@instrumented
+def iter_collection_embeddings(
+    collection_name: str, arxiv_codes: list = None, db_params=db_params, itersize=2000
+):
+    """Stream (arxiv_code, chunk_id, embedding) rows of a vector store collection
+    (chunk_id is None for abstracts), optionally restricted to some arxiv codes."""
+    code_filter = ""
+    params = {"collection_name": collection_name}
+    if arxiv_codes is not None:
+        code_filter = "AND (l.cmetadata->>'arxiv_code') = ANY(%(codes)s)"
+        params["codes"] = list(arxiv_codes)
+    query = f"""
+        SELECT (l.cmetadata->>'arxiv_code') AS arxiv_code,
+               CAST((l.cmetadata->>'chunk_id') AS int) AS chunk_id,
+               CAST(l.embedding AS real[]) AS embedding
+        FROM langchain_pg_embedding l
+        JOIN langchain_pg_collection c ON l.collection_id = c.uuid
+        WHERE c.name = %(collection_name)s
+        AND (l.cmetadata->>'arxiv_code') IS NOT NULL
+        {code_filter}
+    """
+    with pg_connection(db_params) as conn:
+        with conn.cursor(name="collection_embeddings") as cur:
+            cur.itersize = itersize
+            cur.execute(query, params)
+            for row in cur:
+                yield row[0], row[1], row[2]
+
+
+@instrumented
+def iter_paper_texts(arxiv_codes: list = None, db_params=db_params, itersize=500):
+    """Stream (arxiv_code, title, abstract, chunk_text) for papers, with their
+    child chunks concatenated in order (None if not chunked yet)."""
+    details_filter, chunks_filter = "", ""
+    params = {}
+    if arxiv_codes is not None:
+        details_filter = "WHERE d.arxiv_code = ANY(%(codes)s)"
+        chunks_filter = "WHERE c.arxiv_code = ANY(%(codes)s)"
+        params["codes"] = list(arxiv_codes)
+    query = f"""
+        SELECT d.arxiv_code, d.title, d.summary, c.text
+        FROM arxiv_details d
+        LEFT JOIN (
+            SELECT c.arxiv_code, string_agg(c.text, ' ' ORDER BY c.chunk_id) AS text
+            FROM arxiv_chunks c
+            {chunks_filter}
+            GROUP BY c.arxiv_code
+        ) c ON c.arxiv_code = d.arxiv_code
+        {details_filter}
+    """
+    with pg_connection(db_params) as conn:
+        with conn.cursor(name="paper_texts") as cur:
+            cur.itersize = itersize
+            cur.execute(query, params)
+            for row in cur:
+                yield row
+
+
+@instrumented
 def get_arxiv_title_dict(db_params=db_params):
     """Get a list of all arxiv titles in the database."""
-    with psycopg2.connect(**db_params) as conn:
+    with pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 f"""
@@ -476,9 +923,10 @@ def get_arxiv_title_dict(db_params=db_params):
             return title_map
 
 
+@instrumented
 def get_topic_embedding_dist(db_params=db_params):
     """Get mean and stdDev for topic embeddings (dim1 & dim2)."""
-    with psycopg2.connect(**db_params) as conn:
+    with pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -494,41 +942,86 @@ def get_topic_embedding_dist(db_params=db_params):
             return res
 
 
-def get_weekly_summary_inputs(date: str):
-    """Get weekly summaries for a given date (from last monday to next sunday)."""
-    engine = create_engine(database_url)
-    ## Find last monday if not monday.
-    date_st = pd.to_datetime(date).date() - pd.Timedelta(
-        days=pd.to_datetime(date).weekday()
+def week_bounds(start: str, end: str = None) -> tuple:
+    """Monday of the week containing `start` and the Monday after the week
+    containing `end` (half-open range)."""
+    end = end or start
+    date_st = pd.to_datetime(start).date() - pd.Timedelta(
+        days=pd.to_datetime(start).weekday()
     )
-    ## Find next sunday if not sunday.
-    date_end = pd.to_datetime(date).date() + pd.Timedelta(
-        days=6 - pd.to_datetime(date).weekday()
+    date_end = pd.to_datetime(end).date() + pd.Timedelta(
+        days=7 - pd.to_datetime(end).weekday()
     )
+    return date_st, date_end
+
+
+@instrumented
+def get_weekly_summary_inputs_range(start: str, end: str):
+    """Get weekly summary inputs for all weeks between two dates (Monday to Sunday),
+    with a `week_start` column to split them by week."""
+    date_st, date_end = week_bounds(start, end)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
-            f"""
-                SELECT d.published, d.arxiv_code, d.title, d.authors, sd.citation_count, d.arxiv_comment,
-                       d.summary, s.contribution_content, s.takeaway_content, s.takeaway_example, 
-                       d.summary AS recursive_summary, sn.tokens
-                FROM summaries s
-                JOIN arxiv_details d ON s.arxiv_code = d.arxiv_code
-                LEFT JOIN semantic_details sd ON s.arxiv_code = sd.arxiv_code
-                JOIN summary_notes sn ON s.arxiv_code = sn.arxiv_code
-                WHERE d.published BETWEEN '{date_st}' AND '{date_end}'
-                AND sn.level = (SELECT MAX(level) FROM summary_notes WHERE arxiv_code = s.arxiv_code)
+            """
+            WITH latest_notes AS (
+                SELECT DISTINCT ON (sn.arxiv_code) sn.arxiv_code, sn.tokens
+                FROM summary_notes sn
+                JOIN arxiv_details d ON sn.arxiv_code = d.arxiv_code
+                WHERE d.published >= :date_st AND d.published < :date_end
+                ORDER BY sn.arxiv_code, sn.level DESC
+            )
+            SELECT d.published, d.arxiv_code, d.title, d.authors, sd.citation_count, d.arxiv_comment,
+                   d.summary, s.contribution_content, s.takeaway_content, s.takeaway_example,
+                   d.summary AS recursive_summary, ln.tokens,
+                   CAST(date_trunc('week', d.published) AS date) AS week_start
+            FROM summaries s
+            JOIN arxiv_details d ON s.arxiv_code = d.arxiv_code
+            LEFT JOIN semantic_details sd ON s.arxiv_code = sd.arxiv_code
+            JOIN latest_notes ln ON s.arxiv_code = ln.arxiv_code
+            WHERE d.published >= :date_st AND d.published < :date_end
             """
         )
-        result = conn.execute(query)
-        summaries = result.fetchall()
-        summaries_df = pd.DataFrame(summaries)
-        summaries_df["citation_count"] = summaries_df["citation_count"].fillna(0)
+        result = conn.execute(query, {"date_st": date_st, "date_end": date_end})
+        summaries_df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+    summaries_df["citation_count"] = summaries_df["citation_count"].fillna(0)
     return summaries_df
 
 
+def get_weekly_summary_inputs(date: str):
+    """Get weekly summaries for a given date (from last monday to next sunday)."""
+    summaries_df = get_weekly_summary_inputs_range(date, date)
+    return summaries_df.drop(columns=["week_start"])
+
+
+@instrumented
+def get_weekly_counts(start: str, end: str) -> dict:
+    """Number of summarized papers per week ({monday 'YYYY-MM-DD': count}) between
+    two dates, including weeks with no papers."""
+    date_st, date_end = week_bounds(start, end)
+    engine = get_engine()
+    with engine.begin() as conn:
+        query = text(
+            """
+            SELECT CAST(date_trunc('week', d.published) AS date) AS week_start,
+                   COUNT(DISTINCT s.arxiv_code) AS paper_count
+            FROM summaries s
+            JOIN arxiv_details d ON s.arxiv_code = d.arxiv_code
+            WHERE d.published >= :date_st AND d.published < :date_end
+            AND EXISTS (SELECT 1 FROM summary_notes sn WHERE sn.arxiv_code = s.arxiv_code)
+            GROUP BY 1
+            """
+        )
+        result = conn.execute(query, {"date_st": date_st, "date_end": date_end})
+        counts = {row[0].strftime("%Y-%m-%d"): row[1] for row in result.fetchall()}
+    mondays = pd.date_range(date_st, date_end - pd.Timedelta(days=1), freq="W-MON")
+    return {d.strftime("%Y-%m-%d"): counts.get(d.strftime("%Y-%m-%d"), 0) for d in mondays}
+
+
+@instrumented
 def check_weekly_summary_exists(date_str: str):
     """Check if weekly summary exists for a given date."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             f"""
@@ -540,13 +1033,13 @@ def check_weekly_summary_exists(date_str: str):
         result = conn.execute(query)
         count = result.fetchone()[0]
 
-    engine.dispose()
     return count > 0
 
 
+@instrumented
 def get_weekly_summary(date_str: str):
     """Get weekly summary for a given date."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     date_str = (
         pd.to_datetime(date_str).date()
         - pd.Timedelta(days=pd.to_datetime(date_str).weekday())
@@ -562,50 +1055,63 @@ def get_weekly_summary(date_str: str):
         result = conn.execute(query)
         review = result.fetchone()[0]
 
-    engine.dispose()
     return review
 
 
+@instrumented
 def get_extended_notes(arxiv_code: str, level=None, expected_tokens=None):
     """Get extended summary for a given arxiv code."""
-    engine = create_engine(database_url)
-    with engine.begin() as conn:
-        if level:
+    if level:
+        engine = get_engine()
+        with engine.begin() as conn:
             query = text(
-                f"""
-                SELECT arxiv_code, level, summary
-                FROM summary_notes
-                WHERE arxiv_code = '{arxiv_code}'
-                AND level = '{level}';
                 """
-            )
-        elif expected_tokens:
-            query = text(
-                f"""
-                SELECT DISTINCT ON (arxiv_code) arxiv_code, level, summary, tokens
+                SELECT arxiv_code, level, summary
                 FROM summary_notes
-                WHERE arxiv_code = '{arxiv_code}'
-                ORDER BY arxiv_code, ABS(tokens - {expected_tokens}) ASC;
+                WHERE arxiv_code = :arxiv_code
+                AND level = :level;
                 """
             )
-        else:
-            query = text(
-                f"""
-                SELECT DISTINCT ON (arxiv_code) arxiv_code, level, summary
-                FROM summary_notes
-                WHERE arxiv_code = '{arxiv_code}'
-                ORDER BY arxiv_code, level DESC;
-                """
+            result = conn.execute(query, {"arxiv_code": arxiv_code, "level": level})
+            summary = result.fetchone()
+        return summary[2]
+
+    notes = get_extended_notes_many([arxiv_code], expected_tokens=expected_tokens)
+    return notes[arxiv_code]
+
+
+@instrumented
+def get_extended_notes_many(
+    arxiv_codes: list, expected_tokens=None, db_params=db_params, itersize=500
+) -> dict:
+    """Get extended summaries for many arxiv codes in one query, picking for each
+    paper the level closest to `expected_tokens` (or the highest level)."""
+    if expected_tokens:
+        order_by = "arxiv_code, ABS(tokens - %(expected_tokens)s) ASC"
+    else:
+        order_by = "arxiv_code, level DESC"
+    query = f"""
+        SELECT DISTINCT ON (arxiv_code) arxiv_code, summary
+        FROM summary_notes
+        WHERE arxiv_code = ANY(%(codes)s)
+        ORDER BY {order_by};
+    """
+    notes = {}
+    with pg_connection(db_params) as conn:
+        with conn.cursor(name="extended_notes") as cur:
+            cur.itersize = itersize
+            cur.execute(
+                query, {"codes": list(arxiv_codes), "expected_tokens": expected_tokens}
             )
-        result = conn.execute(query)
-        summary = result.fetchone()
-    engine.dispose()
-    return summary[2]
+            for arxiv_code, summary in cur:
+                notes[arxiv_code] = summary
+    return notes
 
 
+@instrumented
 def get_recursive_summary(arxiv_code: str) -> str:
     """Get recursive summary for a given arxiv code."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             f"""
@@ -616,14 +1122,14 @@ def get_recursive_summary(arxiv_code: str) -> str:
         )
         result = conn.execute(query)
         summary = result.fetchone()
-    engine.dispose()
     result = summary[1] if summary else None
     return result
 
 
+@instrumented
 def insert_tweet_review(arxiv_code, review, tstp, tweet_type, rejected=False):
     """Insert tweet review into the database."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             """
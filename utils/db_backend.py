@@ -0,0 +1,539 @@
+"""Database backends behind `utils.db`: Postgres + pgvector (default) or, with
+DB_BACKEND=duckdb, an embedded DuckDB file with the same schema, a brute-force
+`l2_distance` vector search and the catalog as a plain table. A synthetic corpus
+for local benchmarks:
+    DB_BACKEND=duckdb python executors/build_local_corpus.py --n_papers 5000
+"""
+from sqlalchemy import create_engine
+from contextlib import contextmanager
+from psycopg2.extras import execute_values
+import pandas as pd
+import threading
+import time
+import json
+import re
+import os
+
+from utils.db_metrics import (
+    install_engine_hooks,
+    record_acquire,
+    record_statement,
+    InstrumentedCursor,
+)
+
+## Backend selection: "postgres" (default) or "duckdb" (embedded, local file).
+DB_BACKEND = os.getenv("DB_BACKEND", "postgres").lower()
+LOCAL_DB_PATH = os.getenv(
+    "LOCAL_DB_PATH",
+    os.path.join(os.getenv("PROJECT_PATH") or ".", "data", "llmpedia.duckdb"),
+)
+
+## Connection pool settings.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+_backends = {}
+_backend_lock = threading.Lock()
+
+
+def params_to_url(params: dict) -> str:
+    """Build a SQLAlchemy URL from a psycopg2 parameter dict."""
+    return (
+        f"postgresql+psycopg2://{params['user']}:{params['password']}"
+        f"@{params['host']}:{params['port']}/{params['dbname']}"
+    )
+
+
+def list_to_pg_array(lst):
+    return "{" + ",".join(lst) + "}"
+
+
+def to_copy_value(value):
+    """Render python containers the way Postgres expects them in COPY input."""
+    if isinstance(value, (list, tuple)):
+        return list_to_pg_array([str(v) for v in value])
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+def vector_literal(vector) -> str:
+    """Render an embedding in pgvector's text format (float32 precision), the
+    wire format of vector parameters on both backends."""
+    return "[" + ",".join(f"{x:.8g}" for x in vector) + "]"
+
+
+class DataFrameCSVStream:
+    """File-like reader that renders a dataframe as CSV in row batches (for COPY)."""
+
+    def __init__(self, df: pd.DataFrame, batch_size: int = 5000):
+        self.df = df
+        self.batch_size = batch_size
+        self.offset = 0
+        self.buffer = ""
+
+    def _next_batch(self) -> str:
+        batch = self.df.iloc[self.offset : self.offset + self.batch_size]
+        self.offset += self.batch_size
+        for col in batch.columns:
+            if batch[col].dtype == object:
+                batch = batch.assign(**{col: batch[col].map(to_copy_value)})
+        return batch.to_csv(header=False, index=False, na_rep="\\N")
+
+    def read(self, size: int = -1) -> str:
+        while (size < 0 or len(self.buffer) < size) and self.offset < len(self.df):
+            self.buffer += self._next_batch()
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+    def readline(self, size: int = -1) -> str:
+        return self.read(size)
+
+
+##############
+## POSTGRES ##
+##############
+
+
+class PostgresBackend:
+    """Production backend: PostgreSQL + pgvector over one pooled engine."""
+
+    name = "postgres"
+    supports_materialized_views = True
+    supports_index_migrations = True
+
+    def __init__(self, params: dict):
+        self.params = params
+        self.url = params_to_url(params)
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        """Process-wide pooled SQLAlchemy engine (created on first use)."""
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    engine = create_engine(
+                        self.url,
+                        pool_size=DB_POOL_SIZE,
+                        max_overflow=DB_MAX_OVERFLOW,
+                        pool_recycle=DB_POOL_RECYCLE,
+                        pool_pre_ping=DB_POOL_PRE_PING,
+                    )
+                    install_engine_hooks(engine)
+                    self._engine = engine
+        return self._engine
+
+    @contextmanager
+    def connection(self):
+        """Borrow a psycopg2 connection from the engine's pool (which waits for a
+        free slot, pre-pings and recycles); commit on success, rollback on error."""
+        start = time.perf_counter()
+        fairy = self.engine.raw_connection()
+        record_acquire(time.perf_counter() - start)
+        conn = fairy.dbapi_connection
+        ## Raw cursors are timed by the cursor class (engine statements by hooks).
+        conn.cursor_factory = InstrumentedCursor
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.cursor_factory = None
+            fairy.close()
+
+    def insert_rows(self, table_name: str, rows: list):
+        """Insert a batch of dict rows with a single multi-row INSERT."""
+        columns = list(rows[0].keys())
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES %s",
+                    [tuple(row[c] for c in columns) for row in rows],
+                )
+
+    def bulk_load(
+        self,
+        df: pd.DataFrame,
+        table_name: str,
+        if_exists: str = "append",
+        upsert_keys: list = None,
+        batch_size: int = 5000,
+    ):
+        """Bulk load a dataframe with COPY FROM STDIN. With `upsert_keys`, rows are
+        staged in a temp table and replace existing rows matching those keys."""
+        columns = ", ".join(f'"{c}"' for c in df.columns)
+        copy_options = "WITH (FORMAT csv, NULL '\\N')"
+        ## Schema (re-)creation and COPY share one transaction, so readers never
+        ## see an empty re-created table and a failed COPY rolls everything back.
+        with self.engine.begin() as conn:
+            ## Let pandas create (or re-create) the table schema from the dataframe.
+            df.head(0).to_sql(table_name, conn, if_exists=if_exists, index=False)
+            cur = conn.connection.cursor()
+            try:
+                if upsert_keys:
+                    key_match = " AND ".join(f't."{k}" = s."{k}"' for k in upsert_keys)
+                    cur.execute(
+                        f"CREATE TEMP TABLE _staging_{table_name} "
+                        f"(LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP"
+                    )
+                    cur.copy_expert(
+                        f"COPY _staging_{table_name} ({columns}) FROM STDIN {copy_options}",
+                        DataFrameCSVStream(df, batch_size),
+                    )
+                    cur.execute(
+                        f"DELETE FROM {table_name} t USING _staging_{table_name} s "
+                        f"WHERE {key_match}"
+                    )
+                    cur.execute(
+                        f"INSERT INTO {table_name} ({columns}) "
+                        f"SELECT {columns} FROM _staging_{table_name}"
+                    )
+                else:
+                    cur.copy_expert(
+                        f"COPY {table_name} ({columns}) FROM STDIN {copy_options}",
+                        DataFrameCSVStream(df, batch_size),
+                    )
+            finally:
+                cur.close()
+
+    def table_columns(self, table_name: str) -> list:
+        """Column names of a table or (materialized) view; empty if missing."""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT attname
+                    FROM pg_attribute
+                    WHERE attrelid = to_regclass(%s)
+                    AND attnum > 0
+                    AND NOT attisdropped;
+                    """,
+                    (table_name,),
+                )
+                return [row[0] for row in cur.fetchall()]
+
+    def vector_param(self, name: str) -> str:
+        """SQL placeholder for an embedding bound as a `vector_literal` parameter."""
+        return f"CAST(%({name})s AS vector)"
+
+    def vector_column(self, column: str, dim: int) -> str:
+        """Embedding column as typed by the collection's HNSW expression index."""
+        return f"CAST({column} AS vector({dim}))"
+
+    def vector_search_settings(self, k: int) -> str:
+        """Statement prefix letting an HNSW scan return at least `k` rows."""
+        return f"SET LOCAL hnsw.ef_search = {max(k, 40)};\n"
+
+    def vector_distance(self, left: str, right: str) -> str:
+        """SQL expression for the L2 distance between two vector expressions."""
+        return f"{left} <-> {right}"
+
+
+############
+## DUCKDB ##
+############
+
+## Tables used by `utils.db`, mirrored for the embedded backend.
+LOCAL_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS arxiv_details (
+        arxiv_code VARCHAR, updated TIMESTAMP, published TIMESTAMP, title VARCHAR,
+        summary VARCHAR, authors VARCHAR, arxiv_comment VARCHAR, tstp TIMESTAMP)""",
+    """CREATE TABLE IF NOT EXISTS summaries (
+        arxiv_code VARCHAR, contribution_title VARCHAR, contribution_content VARCHAR,
+        takeaway_title VARCHAR, takeaway_content VARCHAR, takeaway_example VARCHAR,
+        category VARCHAR, novelty_score VARCHAR, novelty_analysis VARCHAR,
+        technical_score VARCHAR, technical_analysis VARCHAR, enjoyable_score VARCHAR,
+        enjoyable_analysis VARCHAR, tstp TIMESTAMP)""",
+    """CREATE TABLE IF NOT EXISTS summary_notes (
+        arxiv_code VARCHAR, level INTEGER, summary VARCHAR, tokens INTEGER,
+        tstp TIMESTAMP)""",
+    """CREATE TABLE IF NOT EXISTS recursive_summaries (
+        arxiv_code VARCHAR, summary VARCHAR, tstp TIMESTAMP)""",
+    """CREATE TABLE IF NOT EXISTS bullet_list_summaries (
+        arxiv_code VARCHAR, summary VARCHAR, tstp TIMESTAMP)""",
+    """CREATE TABLE IF NOT EXISTS summary_markdown (
+        arxiv_code VARCHAR, summary VARCHAR, tstp TIMESTAMP)""",
+    """CREATE TABLE IF NOT EXISTS topics (
+        arxiv_code VARCHAR, topic VARCHAR, dim1 DOUBLE, dim2 DOUBLE)""",
+    """CREATE TABLE IF NOT EXISTS similar_documents (
+        arxiv_code VARCHAR, similar_docs VARCHAR)""",
+    """CREATE TABLE IF NOT EXISTS semantic_details (
+        paper_id VARCHAR, arxiv_code VARCHAR, venue VARCHAR, tldr VARCHAR,
+        citation_count INTEGER, influential_citation_count INTEGER)""",
+    """CREATE TABLE IF NOT EXISTS tweet_reviews (
+        arxiv_code VARCHAR, review VARCHAR, tstp TIMESTAMP, tweet_type VARCHAR,
+        rejected BOOLEAN)""",
+    """CREATE TABLE IF NOT EXISTS arxiv_chunks (
+        arxiv_code VARCHAR, chunk_id INTEGER, text VARCHAR)""",
+    """CREATE TABLE IF NOT EXISTS arxiv_parent_chunks (
+        arxiv_code VARCHAR, chunk_id INTEGER, text VARCHAR)""",
+    """CREATE TABLE IF NOT EXISTS arxiv_large_parent_chunks (
+        arxiv_code VARCHAR, chunk_id INTEGER, text VARCHAR)""",
+    """CREATE TABLE IF NOT EXISTS arxiv_chunk_map (
+        arxiv_code VARCHAR, child_id INTEGER, parent_id INTEGER, version VARCHAR)""",
+    """CREATE TABLE IF NOT EXISTS weekly_reviews (
+        date DATE, tstp TIMESTAMP, review VARCHAR, review_json VARCHAR)""",
+    """CREATE TABLE IF NOT EXISTS issue_reports (
+        issue_id VARCHAR, tstp TIMESTAMP, arxiv_code VARCHAR, issue_type VARCHAR,
+        resolved BOOLEAN)""",
+    """CREATE TABLE IF NOT EXISTS visit_logs (
+        visit_id VARCHAR, tstp TIMESTAMP, entrypoint VARCHAR)""",
+    """CREATE TABLE IF NOT EXISTS qna_logs (
+        qna_id VARCHAR, tstp TIMESTAMP, user_question VARCHAR, response VARCHAR)""",
+    """CREATE TABLE IF NOT EXISTS error_logs (
+        error_id VARCHAR, tstp TIMESTAMP, error VARCHAR)""",
+    """CREATE TABLE IF NOT EXISTS langchain_pg_collection (
+        uuid VARCHAR, name VARCHAR, cmetadata JSON)""",
+    """CREATE TABLE IF NOT EXISTS langchain_pg_embedding (
+        uuid VARCHAR, collection_id VARCHAR, embedding DOUBLE[], document VARCHAR,
+        cmetadata JSON, custom_id VARCHAR)""",
+    ## Brute-force stand-ins for the pgvector distance operators (<->, <=>).
+    "CREATE OR REPLACE MACRO l2_distance(a, b) AS list_distance(a, b)",
+    "CREATE OR REPLACE MACRO cosine_distance(a, b) AS 1 - list_cosine_similarity(a, b)",
+]
+
+_PYFORMAT_PARAM = re.compile(r"%\((\w+)\)s")
+
+
+def to_duckdb_sql(query: str, params=None):
+    """Translate a psycopg2 (pyformat) statement and its parameters to DuckDB."""
+    if params is None:
+        return query, None
+    if isinstance(params, dict):
+        names = set(_PYFORMAT_PARAM.findall(query))
+        query = _PYFORMAT_PARAM.sub(r"$\1", query)
+        params = {k: v for k, v in params.items() if k in names}
+    else:
+        query = query.replace("%s", "?")
+    return query.replace("%%", "%"), params
+
+
+class DuckDBCursor:
+    """psycopg2-style cursor over a DuckDB connection (pyformat parameters,
+    iteration in `itersize` batches, usable as a context manager)."""
+
+    itersize = 1000
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.rowcount = -1
+
+    def execute(self, query, vars=None):
+        sql, params = to_duckdb_sql(query, vars)
+        start = time.perf_counter()
+        try:
+            if params:
+                self._conn.execute(sql, params)
+            else:
+                self._conn.execute(sql)
+        finally:
+            record_statement(query, time.perf_counter() - start, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        sql, _ = to_duckdb_sql(query, vars_list[0] if vars_list else None)
+        self._conn.executemany(sql, vars_list)
+
+    @property
+    def description(self):
+        return self._conn.description
+
+    def fetchone(self):
+        return self._conn.fetchone()
+
+    def fetchmany(self, size: int = None):
+        return self._conn.fetchmany(size or self.itersize)
+
+    def fetchall(self):
+        return self._conn.fetchall()
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(self.itersize)
+            if not rows:
+                return
+            yield from rows
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DuckDBConnection:
+    """psycopg2-style connection facade; named (server-side) cursors map to
+    plain cursors, since DuckDB fetches lazily anyway."""
+
+    def __init__(self, conn):
+        self.raw = conn
+
+    def cursor(self, name: str = None):
+        return DuckDBCursor(self.raw)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+
+class DuckDBBackend:
+    """Embedded single-file backend for offline runs, CI and benchmarks.
+    Vector search is a brute-force scan through the `l2_distance` macro."""
+
+    name = "duckdb"
+    supports_materialized_views = False
+    supports_index_migrations = False
+
+    def __init__(self, path: str = LOCAL_DB_PATH):
+        self.path = path
+        self.url = f"duckdb:///{path}"
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        """SQLAlchemy engine over the local database file (schema created on first use)."""
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    if os.path.dirname(self.path):
+                        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    engine = create_engine(self.url)
+                    install_engine_hooks(engine)
+                    self._engine = engine
+                    self.create_schema()
+        return self._engine
+
+    def create_schema(self):
+        """Create the local mirror of the production tables (idempotent)."""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                for statement in LOCAL_SCHEMA:
+                    cur.execute(statement)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled DuckDB connection as one transaction; commit on
+        success, rollback on error."""
+        start = time.perf_counter()
+        fairy = self.engine.raw_connection()
+        record_acquire(time.perf_counter() - start)
+        conn = DuckDBConnection(fairy.dbapi_connection)
+        try:
+            conn.raw.begin()
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        finally:
+            fairy.close()
+
+    def insert_rows(self, table_name: str, rows: list):
+        """Insert a batch of dict rows."""
+        columns = list(rows[0].keys())
+        placeholders = ", ".join(["?"] * len(columns))
+        with self.connection() as conn:
+            conn.raw.executemany(
+                f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})",
+                [tuple(row[c] for c in columns) for row in rows],
+            )
+
+    def _column_types(self, conn, table_name: str) -> dict:
+        conn.raw.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = ?",
+            [table_name],
+        )
+        return dict(conn.raw.fetchall())
+
+    def bulk_load(
+        self,
+        df: pd.DataFrame,
+        table_name: str,
+        if_exists: str = "append",
+        upsert_keys: list = None,
+        batch_size: int = 5000,
+    ):
+        """Bulk load a dataframe by scanning it in place (no row-by-row inserts).
+        With `upsert_keys`, existing rows matching those keys are replaced."""
+        columns = ", ".join(f'"{c}"' for c in df.columns)
+        with self.connection() as conn:
+            if if_exists == "replace":
+                conn.raw.execute(f"DROP TABLE IF EXISTS {table_name}")
+            column_types = self._column_types(conn, table_name)
+            ## Containers are stored as text (pg array / JSON) unless the column is a list.
+            df = df.assign(
+                **{
+                    c: df[c].map(to_copy_value)
+                    for c in df.columns
+                    if df[c].dtype == object
+                    and not column_types.get(c, "").endswith("[]")
+                }
+            )
+            conn.raw.register("_bulk_df", df)
+            try:
+                if not column_types:
+                    conn.raw.execute(
+                        f"CREATE TABLE {table_name} AS SELECT * FROM _bulk_df"
+                    )
+                    return
+                if upsert_keys:
+                    key_match = " AND ".join(
+                        f'{table_name}."{k}" = s."{k}"' for k in upsert_keys
+                    )
+                    conn.raw.execute(
+                        f"DELETE FROM {table_name} USING _bulk_df s WHERE {key_match}"
+                    )
+                conn.raw.execute(
+                    f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM _bulk_df"
+                )
+            finally:
+                conn.raw.unregister("_bulk_df")
+
+    def table_columns(self, table_name: str) -> list:
+        """Column names of a table or view; empty if missing."""
+        with self.connection() as conn:
+            return list(self._column_types(conn, table_name).keys())
+
+    def vector_param(self, name: str) -> str:
+        """SQL placeholder for an embedding bound as a `vector_literal` parameter."""
+        return f"CAST(%({name})s AS DOUBLE[])"
+
+    def vector_column(self, column: str, dim: int) -> str:
+        return column
+
+    def vector_search_settings(self, k: int) -> str:
+        return ""
+
+    def vector_distance(self, left: str, right: str) -> str:
+        """SQL expression for the L2 distance between two vector expressions."""
+        return f"l2_distance({left}, {right})"
+
+
+def get_backend(params: dict = None):
+    """Get the process-wide backend selected by DB_BACKEND. Connection params
+    only apply to Postgres; the local backend always uses LOCAL_DB_PATH."""
+    if DB_BACKEND == "duckdb":
+        key = ("duckdb", LOCAL_DB_PATH)
+    else:
+        key = ("postgres",) + tuple(sorted(params.items()))
+    if key not in _backends:
+        with _backend_lock:
+            if key not in _backends:
+                if DB_BACKEND == "duckdb":
+                    _backends[key] = DuckDBBackend(LOCAL_DB_PATH)
+                else:
+                    _backends[key] = PostgresBackend(params)
+    return _backends[key]
@@ -0,0 +1,288 @@
+"""In-process DB metrics: latency, rows, bytes and connection-acquire wait per
+`utils.db` helper, plus slow-statement logging with literals stripped. With
+DB_METRICS_DIR set each process dumps its registry on exit; summarize with:
+    python executors/db_metrics_report.py $DB_METRICS_DIR
+"""
+from contextvars import ContextVar
+from contextlib import contextmanager
+from collections import defaultdict
+from functools import wraps
+import numpy as np
+import pandas as pd
+import threading
+import inspect
+import atexit
+import time
+import json
+import sys
+import os
+import re
+
+from psycopg2.extensions import cursor as pg_cursor
+
+## Statements slower than this (ms) are logged with their shape.
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 500))
+## If set, each process writes its metrics here on exit (read by the report CLI).
+METRICS_DIR = os.getenv("DB_METRICS_DIR")
+## Latency samples kept per helper and metric.
+MAX_SAMPLES = 5000
+
+current_helper = ContextVar("current_helper", default=None)
+helper_start = ContextVar("helper_start", default=None)
+
+
+class MetricsRegistry:
+    """Thread-safe in-process store of per-helper DB metrics."""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.samples = defaultdict(lambda: defaultdict(list))
+        self.totals = defaultdict(lambda: defaultdict(float))
+
+    def observe(self, helper: str, metric: str, value: float):
+        """Record a latency-like sample (kept for percentiles)."""
+        with self._lock:
+            samples = self.samples[helper][metric]
+            samples.append(value)
+            if len(samples) > self.max_samples:
+                del samples[: len(samples) - self.max_samples]
+
+    def add(self, helper: str, metric: str, value: float):
+        """Accumulate a counter (calls, rows, bytes)."""
+        with self._lock:
+            self.totals[helper][metric] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "samples": {h: dict(m) for h, m in self.samples.items()},
+                "totals": {h: dict(m) for h, m in self.totals.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.totals.clear()
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f)
+
+
+registry = MetricsRegistry()
+
+
+def summarize(snapshots: list) -> pd.DataFrame:
+    """p50/p95/p99 latency (ms) and totals per helper from registry snapshots."""
+    samples = defaultdict(lambda: defaultdict(list))
+    totals = defaultdict(lambda: defaultdict(float))
+    for snapshot in snapshots:
+        for helper, metrics in snapshot["samples"].items():
+            for metric, values in metrics.items():
+                samples[helper][metric].extend(values)
+        for helper, metrics in snapshot["totals"].items():
+            for metric, value in metrics.items():
+                totals[helper][metric] += value
+
+    records = []
+    for helper in sorted(set(samples) | set(totals)):
+        latency = np.array(samples[helper].get("latency", [0.0])) * 1000
+        acquire = np.array(samples[helper].get("acquire", [0.0])) * 1000
+        records.append(
+            {
+                "helper": helper,
+                "calls": int(totals[helper].get("calls", 0)),
+                "p50_ms": np.percentile(latency, 50),
+                "p95_ms": np.percentile(latency, 95),
+                "p99_ms": np.percentile(latency, 99),
+                "total_s": latency.sum() / 1000,
+                "acquire_p95_ms": np.percentile(acquire, 95),
+                "statements": int(totals[helper].get("statements", 0)),
+                "rows": int(totals[helper].get("rows", 0)),
+                "bytes": int(totals[helper].get("bytes", 0)),
+            }
+        )
+    summary_df = pd.DataFrame(records)
+    if len(summary_df) > 0:
+        summary_df.sort_values("total_s", ascending=False, inplace=True)
+    return summary_df
+
+
+def query_shape(statement: str, max_len: int = 300) -> str:
+    """Strip literal values from a statement so it can be logged safely."""
+    shape = re.sub(r"'(?:[^']|'')*'", "?", statement)
+    shape = re.sub(r"\b\d+(\.\d+)?(e-?\d+)?\b", "?", shape)
+    shape = re.sub(r"\?(\s*,\s*\?)+", "?, ...", shape)
+    shape = re.sub(r"\s+", " ", shape).strip()
+    return shape[:max_len]
+
+
+def estimate_bytes(result) -> int:
+    """Rough in-memory size of a helper's result."""
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    if isinstance(result, dict):
+        result = list(result.values())
+    if isinstance(result, (list, tuple)) and len(result) > 0:
+        sample = result[:100]
+        sample_size = sum(
+            sum(sys.getsizeof(v) for v in row)
+            if isinstance(row, (list, tuple))
+            else sys.getsizeof(row)
+            for row in sample
+        )
+        return int(sample_size * len(result) / len(sample))
+    return sys.getsizeof(result) if result is not None else 0
+
+
+def chunk_rows(item) -> int:
+    """Rows in an item yielded by a streaming helper: DataFrame and Arrow batch
+    chunks count their rows, anything else (a row, a code) counts as one."""
+    if isinstance(item, pd.DataFrame):
+        return len(item)
+    return getattr(item, "num_rows", 1)
+
+
+@contextmanager
+def helper_scope(name: str, start: float):
+    """Attribute statements run inside the block to helper `name`."""
+    helper_token = current_helper.set(name)
+    start_token = helper_start.set(start)
+    try:
+        yield
+    finally:
+        current_helper.reset(helper_token)
+        helper_start.reset(start_token)
+
+
+def _record_result(name: str, result):
+    if isinstance(result, (pd.DataFrame, list, tuple, dict)):
+        registry.add(name, "rows", len(result))
+    registry.add(name, "bytes", estimate_bytes(result))
+
+
+def instrumented(fn):
+    """Record latency, rows and bytes for a db helper."""
+    name = fn.__name__
+
+    if inspect.isgeneratorfunction(fn):
+
+        @wraps(fn)
+        def gen_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            rows = 0
+            ## The helper is only current while the inner generator runs, not
+            ## in the caller's code between items.
+            items = fn(*args, **kwargs)
+            try:
+                while True:
+                    with helper_scope(name, start):
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            break
+                    rows += chunk_rows(item)
+                    yield item
+            finally:
+                with helper_scope(name, start):
+                    items.close()
+                registry.add(name, "calls", 1)
+                registry.add(name, "rows", rows)
+                registry.observe(name, "latency", time.perf_counter() - start)
+
+        return gen_wrapper
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with helper_scope(name, start):
+                result = fn(*args, **kwargs)
+        finally:
+            registry.add(name, "calls", 1)
+            registry.observe(name, "latency", time.perf_counter() - start)
+        _record_result(name, result)
+        return result
+
+    return wrapper
+
+
+def record_statement(statement: str, elapsed: float, rowcount: int = None):
+    """Record one executed statement under the active helper."""
+    helper = current_helper.get() or "<unscoped>"
+    registry.add(helper, "statements", 1)
+    registry.observe(helper, "statement", elapsed)
+    if helper == "<unscoped>" and rowcount is not None and rowcount > 0:
+        registry.add(helper, "rows", rowcount)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        print(
+            f"Slow query in {helper} ({elapsed * 1000:.0f} ms): "
+            f"{query_shape(str(statement))}"
+        )
+
+
+def record_acquire(elapsed: float):
+    """Record time spent waiting for a pooled connection."""
+    registry.observe(current_helper.get() or "<unscoped>", "acquire", elapsed)
+
+
+def install_engine_hooks(engine):
+    """Attach statement timing and pool checkout hooks to a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    ## Start times live on the statement's execution context, so a statement that
+    ## raises leaves nothing behind on the (pooled) connection.
+    def pop_start(context):
+        return context.__dict__.pop("_query_start", None) if context is not None else None
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = pop_start(context)
+        if start is not None:
+            record_statement(statement, time.perf_counter() - start, cursor.rowcount)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        start = pop_start(exception_context.execution_context)
+        if start is not None:
+            record_statement(exception_context.statement, time.perf_counter() - start)
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_conn, conn_record, conn_proxy):
+        ## Approximated as time since the helper was entered.
+        start = helper_start.get()
+        if start is not None:
+            record_acquire(time.perf_counter() - start)
+
+
+class InstrumentedCursor(pg_cursor):
+    """psycopg2 cursor that records statement timings in the registry."""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_statement(query, time.perf_counter() - start, self.rowcount)
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            record_statement(sql, time.perf_counter() - start, self.rowcount)
+
+
+def _dump_on_exit():
+    if METRICS_DIR and registry.snapshot()["totals"]:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        registry.dump(os.path.join(METRICS_DIR, f"db_metrics_{os.getpid()}.json"))
+
+
+atexit.register(_dump_on_exit)
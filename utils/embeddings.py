@@ -0,0 +1,129 @@
+"""Process-wide embedding clients and a query embedding cache (in-memory LRU
+backed by SQLite, keyed by model and normalized query).
+"""
+from collections import OrderedDict
+import numpy as np
+import threading
+import hashlib
+import sqlite3
+import os
+
+## Two-tier query embedding cache: in-memory LRU in front of a SQLite file.
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 2048))
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.environ.get("PROJECT_PATH", "."), "data", "embedding_cache.sqlite"),
+)
+
+_clients = {}
+_client_lock = threading.Lock()
+
+
+def create_embedding_client(model_name: str):
+    """Instantiate the langchain embeddings client for a model."""
+    if "embed-english" in model_name:
+        from langchain_cohere import CohereEmbeddings
+
+        return CohereEmbeddings(
+            cohere_api_key=os.getenv("COHERE_API_KEY"), model=model_name
+        )
+    from langchain_community.embeddings.huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+def get_embedding_client(model_name: str):
+    """Process-wide embeddings client for a model (loaded once)."""
+    if model_name not in _clients:
+        with _client_lock:
+            if model_name not in _clients:
+                _clients[model_name] = create_embedding_client(model_name)
+    return _clients[model_name]
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).lower()
+
+
+class EmbeddingCache:
+    """LRU of query embeddings keyed by (model, normalized query), backed by an
+    on-disk SQLite store shared across processes and restarts."""
+
+    def __init__(self, max_size: int = EMBEDDING_CACHE_SIZE, path: str = EMBEDDING_CACHE_PATH):
+        self.max_size = max_size
+        self.path = path
+        self.memory = OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _disk(self):
+        if self._conn is None and self.path:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings "
+                "(key TEXT PRIMARY KEY, model TEXT, query TEXT, vector BLOB)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(model_name: str, query: str) -> str:
+        return hashlib.sha1(f"{model_name}\n{query}".encode()).hexdigest()
+
+    def get(self, model_name: str, query: str):
+        """Cached embedding (list of floats) or None."""
+        key = self.make_key(model_name, query)
+        with self._lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self.memory[key]
+            disk = self._disk()
+            row = None
+            if disk is not None:
+                row = disk.execute(
+                    "SELECT vector FROM query_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        vector = np.frombuffer(row[0], dtype=np.float32).tolist()
+        self.stats["disk_hits"] += 1
+        self._remember(key, vector)
+        return vector
+
+    def put(self, model_name: str, query: str, vector: list):
+        key = self.make_key(model_name, query)
+        self._remember(key, vector)
+        with self._lock:
+            disk = self._disk()
+            if disk is not None:
+                disk.execute(
+                    "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?, ?)",
+                    (key, model_name, query, np.asarray(vector, dtype=np.float32).tobytes()),
+                )
+                disk.commit()
+
+    def _remember(self, key: str, vector: list):
+        with self._lock:
+            self.memory[key] = vector
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_size:
+                self.memory.popitem(last=False)
+
+
+query_cache = EmbeddingCache()
+
+
+def embed_query(query: str, model_name: str) -> list:
+    """Embed a search query, skipping the model entirely on cache hits. The
+    normalized text only keys the cache; the model embeds the query as given."""
+    cache_key = normalize_query(query)
+    vector = query_cache.get(model_name, cache_key)
+    if vector is None:
+        vector = get_embedding_client(model_name).embed_query(query)
+        query_cache.put(model_name, cache_key, vector)
+    return vector
@@ -89,3 +89,57 @@ def create_openai_message(
         )
         answer = response
     return answer
+
+
+def stream_instructor_query(
+    system_message: str,
+    user_message: str,
+    llm_model: str = "claude-3-haiku-20240307",
+    temperature: float = 0.5,
+):
+    """Run an unstructured query and yield the response text as it is generated."""
+    model_type = "OpenAI" if "gpt" in llm_model else "Anthropic"
+    if model_type == "Anthropic":
+        client = Anthropic()
+        chunks = stream_anthropic_message(
+            client, system_message, user_message, llm_model, temperature
+        )
+    elif model_type == "OpenAI":
+        client = OpenAI()
+        chunks = stream_openai_message(
+            client, system_message, user_message, llm_model, temperature
+        )
+    else:
+        raise ValueError(f"Unsupported model type: {model_type}")
+
+    yield from chunks
+
+
+def stream_anthropic_message(client, system_message, user_message, llm_model, temperature):
+    """Stream a message's text deltas with the Anthropic client."""
+    with client.messages.stream(
+        max_tokens=4096,
+        model=llm_model,
+        system=system_message,
+        temperature=temperature,
+        messages=[
+            {"role": "user", "content": user_message},
+        ],
+    ) as stream:
+        yield from stream.text_stream
+
+
+def stream_openai_message(client, system_message, user_message, llm_model, temperature):
+    """Stream a message's text deltas with the OpenAI client."""
+    response = client.chat.completions.create(
+        model=llm_model,
+        temperature=temperature,
+        messages=[
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message},
+        ],
+        stream=True,
+    )
+    for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
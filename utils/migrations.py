@@ -0,0 +1,227 @@
+"""Versioned index migrations, applied at the start of workflow.sh and built
+concurrently so writers are not blocked:
+    python executors/migrate_db.py migrate|verify|report
+
+GPT Maestro's SQL vector search binds each query embedding as a parameter and
+runs one top-k CTE per query, served by a per-collection HNSW partial index on
+`embedding::vector(dims)` (see executors/benchmark_vector_params.py).
+"""
+from datetime import datetime
+import pandas as pd
+
+import utils.db as db
+
+## Versioned schema migrations. Each index is (name, table, definition, where);
+## `definition` is the column/expression list and `where` an optional predicate
+## for partial indexes. Applied versions are tracked in `schema_migrations`.
+MIGRATIONS = [
+    {
+        "version": 1,
+        "name": "chunk_lookup_indexes",
+        "indexes": [
+            ("arxiv_chunk_map_code_child_version_idx", "arxiv_chunk_map", "arxiv_code, child_id, version", None),
+            ("arxiv_chunks_code_chunk_idx", "arxiv_chunks", "arxiv_code, chunk_id", None),
+            ("arxiv_parent_chunks_code_chunk_idx", "arxiv_parent_chunks", "arxiv_code, chunk_id", None),
+            ("arxiv_large_parent_chunks_code_chunk_idx", "arxiv_large_parent_chunks", "arxiv_code, chunk_id", None),
+        ],
+    },
+    {
+        "version": 2,
+        "name": "arxiv_code_indexes",
+        "indexes": [
+            ("arxiv_details_arxiv_code_idx", "arxiv_details", "arxiv_code", None),
+            ("summaries_arxiv_code_idx", "summaries", "arxiv_code", None),
+            ("summary_notes_code_level_idx", "summary_notes", "arxiv_code, level", None),
+            ("recursive_summaries_arxiv_code_idx", "recursive_summaries", "arxiv_code", None),
+            ("bullet_list_summaries_arxiv_code_idx", "bullet_list_summaries", "arxiv_code", None),
+            ("summary_markdown_arxiv_code_idx", "summary_markdown", "arxiv_code", None),
+            ("semantic_details_arxiv_code_idx", "semantic_details", "arxiv_code", None),
+            ("topics_arxiv_code_idx", "topics", "arxiv_code", None),
+            ("similar_documents_arxiv_code_idx", "similar_documents", "arxiv_code", None),
+            ("tweet_reviews_code_type_idx", "tweet_reviews", "arxiv_code, tweet_type", None),
+        ],
+    },
+    {
+        "version": 3,
+        "name": "filter_indexes",
+        "indexes": [
+            ("arxiv_details_published_idx", "arxiv_details", "published", None),
+            ("issue_reports_open_type_idx", "issue_reports", "issue_type, arxiv_code", "resolved = false"),
+        ],
+    },
+    {
+        "version": 4,
+        "name": "embedding_metadata_indexes",
+        "indexes": [
+            ("langchain_pg_embedding_collection_code_idx", "langchain_pg_embedding", "collection_id, (cmetadata->>'arxiv_code')", None),
+        ],
+    },
+]
+
+
+## HNSW indexes on the vector store, one per collection (name -> embedding dims),
+## built on `embedding::vector(dims)` and partial on the collection UUID.
+VECTOR_INDEX_COLLECTIONS = {"arxiv_abstracts": 1024}
+HNSW_OPTIONS = "m = 16, ef_construction = 64"
+
+
+def vector_index_name(collection_name: str) -> str:
+    return f"langchain_pg_embedding_{collection_name}_hnsw_idx"
+
+
+def ensure_vector_index(collection_name: str, db_params=db.db_params):
+    """Create a collection's HNSW index if missing (no-op on backends without
+    index support or when the collection does not exist yet)."""
+    backend = db.get_backend(db_params)
+    collection_id = db.get_collection_uuid(collection_name, db_params)
+    if not backend.supports_index_migrations or collection_id is None:
+        return None
+    dim = VECTOR_INDEX_COLLECTIONS[collection_name]
+    name = vector_index_name(collection_name)
+    create_index(
+        name,
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON langchain_pg_embedding "
+        f"USING hnsw (({backend.vector_column('embedding', dim)}) vector_l2_ops) "
+        f"WITH ({HNSW_OPTIONS}) WHERE collection_id = '{collection_id}';",
+        db_params,
+    )
+    return name
+
+
+def ensure_vector_indexes(db_params=db.db_params) -> list:
+    """Create the HNSW indexes of all configured collections."""
+    created = [ensure_vector_index(name, db_params) for name in VECTOR_INDEX_COLLECTIONS]
+    return [name for name in created if name]
+
+
+def index_statement(name: str, table: str, definition: str, where: str = None) -> str:
+    """Render a CREATE INDEX CONCURRENTLY statement (idempotent)."""
+    statement = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({definition})"
+    if where:
+        statement += f" WHERE {where}"
+    return statement + ";"
+
+
+def get_index_names(valid: bool = True, db_params=db.db_params) -> set:
+    """Names of the valid (or the invalid) indexes in the public schema."""
+    rows = db.execute_query(
+        """
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND i.indisvalid = %(valid)s;
+        """,
+        db_params,
+        params={"valid": valid},
+    )
+    return {row[0] for row in rows}
+
+
+def get_invalid_indexes(db_params=db.db_params) -> set:
+    """Indexes left invalid by a failed concurrent build."""
+    return get_index_names(False, db_params)
+
+
+def create_index(name: str, statement: str, db_params=db.db_params):
+    """Build an index without blocking writes (CONCURRENTLY, in autocommit mode).
+    An invalid leftover of a failed build is dropped first, since IF NOT EXISTS
+    would otherwise keep it."""
+    if name in get_invalid_indexes(db_params):
+        db.execute_autocommit(f"DROP INDEX CONCURRENTLY IF EXISTS {name};", db_params)
+    db.execute_autocommit(statement, db_params)
+
+
+def ensure_migrations_table(db_params=db.db_params):
+    db.execute_statement(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        );
+        """,
+        db_params,
+    )
+
+
+def get_applied_versions(db_params=db.db_params) -> list:
+    """Get the migration versions already applied."""
+    ensure_migrations_table(db_params)
+    rows = db.execute_query("SELECT version FROM schema_migrations;", db_params)
+    return sorted(row[0] for row in rows)
+
+
+def migrate(db_params=db.db_params, target_version: int = None) -> list:
+    """Apply pending migrations in order. Indexes are built concurrently, and a
+    version is recorded once all of its indexes are in place."""
+    applied = set(get_applied_versions(db_params))
+    newly_applied = []
+    for migration in MIGRATIONS:
+        version = migration["version"]
+        if version in applied:
+            continue
+        if target_version is not None and version > target_version:
+            break
+        for index in migration["indexes"]:
+            create_index(index[0], index_statement(*index), db_params)
+        with db.pg_connection(db_params) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, name, applied_at) "
+                    "VALUES (%s, %s, %s);",
+                    (version, migration["name"], datetime.now()),
+                )
+        newly_applied.append(version)
+        print(f"Applied migration {version}: {migration['name']}.")
+    return newly_applied
+
+
+def get_existing_indexes(db_params=db.db_params) -> set:
+    """Valid indexes (an invalid one left by a failed build counts as missing)."""
+    return get_index_names(True, db_params)
+
+
+def verify_indexes(db_params=db.db_params) -> pd.DataFrame:
+    """Check every index declared in the migrations against the database."""
+    existing = get_existing_indexes(db_params)
+    records = [
+        {
+            "version": migration["version"],
+            "index": name,
+            "table": table,
+            "present": name in existing,
+        }
+        for migration in MIGRATIONS
+        for name, table, _, _ in migration["indexes"]
+    ]
+    records += [
+        {
+            "version": None,
+            "index": vector_index_name(collection_name),
+            "table": "langchain_pg_embedding",
+            "present": vector_index_name(collection_name) in existing,
+        }
+        for collection_name in VECTOR_INDEX_COLLECTIONS
+    ]
+    return pd.DataFrame(records)
+
+
+def report_missing_indexes(db_params=db.db_params) -> pd.DataFrame:
+    """Missing declared indexes alongside the table's sequential scan counts,
+    ordered by the rows read through sequential scans."""
+    status_df = verify_indexes(db_params)
+    missing_df = status_df[~status_df["present"]]
+    rows = db.execute_query(
+        """
+        SELECT relname, seq_scan, seq_tup_read, COALESCE(idx_scan, 0), n_live_tup
+        FROM pg_stat_user_tables;
+        """,
+        db_params,
+    )
+    stats_df = pd.DataFrame(
+        rows,
+        columns=["table", "seq_scan", "seq_tup_read", "idx_scan", "n_live_tup"],
+    )
+    report_df = missing_df.merge(stats_df, on="table", how="left")
+    return report_df.sort_values("seq_tup_read", ascending=False)
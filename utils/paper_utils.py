@@ -20,13 +20,16 @@ dotenv.load_dotenv()
 PROJECT_PATH = os.environ.get("PROJECT_PATH")
 DATA_PATH = os.path.join(PROJECT_PATH, "data")
 
-db_params = {
-    "dbname": os.environ["DB_NAME"],
-    "user": os.environ["DB_USER"],
-    "password": os.environ["DB_PASS"],
-    "host": os.environ["DB_HOST"],
-    "port": os.environ["DB_PORT"],
-}
+if os.getenv("DB_BACKEND", "postgres").lower() == "duckdb":
+    db_params = {}
+else:
+    db_params = {
+        "dbname": os.environ["DB_NAME"],
+        "user": os.environ["DB_USER"],
+        "password": os.environ["DB_PASS"],
+        "host": os.environ["DB_HOST"],
+        "port": os.environ["DB_PORT"],
+    }
 
 ss_api_key = os.environ["SEMANTIC_SCHOLAR_API_KEY"]
 
@@ -0,0 +1,254 @@
+"""Offline side store of a collection's embeddings at three precisions (packed
+sign bits, int8, float32), searched by a quantized shortlist plus float rescoring.
+No serving path reads it; memory, latency and recall against a float32 scan:
+    python executors/benchmark_quantized_store.py [--synthetic 100000]
+"""
+import numpy as np
+import threading
+import json
+import os
+
+import utils.ann_index as ann
+import utils.db as db
+
+## Versioned on-disk stores, one per collection (published like the ANN indexes).
+QUANT_STORE_DIR = os.getenv(
+    "QUANT_STORE_DIR",
+    os.path.join(os.environ.get("PROJECT_PATH", "."), "data", "quantized_store"),
+)
+## Shortlist size (as a multiple of k) rescored at full precision.
+QUANT_OVERSAMPLE = 10
+## Rows per scan batch (keeps the int8 -> float32 conversion buffer cache-sized).
+BATCH_ROWS = 4096
+
+## Set bits per 16-bit value, for Hamming distances on packed sign bits when
+## numpy has no np.bitwise_count (< 2.0).
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+POPCOUNT16 = (POPCOUNT[:, None] + POPCOUNT[None, :]).reshape(-1)
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+
+def quantize_int8(vectors: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def hamming(bits: np.ndarray, query_bits: np.ndarray) -> np.ndarray:
+    """Hamming distances between packed bit rows and a packed query."""
+    width = bits.shape[1]
+    if hasattr(np, "bitwise_count"):
+        if width % 8 == 0:
+            bits, query_bits = bits.view(np.uint64), query_bits.view(np.uint64)
+        return np.bitwise_count(bits ^ query_bits).sum(axis=1, dtype=np.int32)
+    if width % 2 == 0:
+        xor = bits.view(np.uint16) ^ query_bits.view(np.uint16)
+        return np.take(POPCOUNT16, xor).sum(axis=1, dtype=np.int32)
+    return np.take(POPCOUNT, bits ^ query_bits).sum(axis=1, dtype=np.int32)
+
+
+class QuantizedStore:
+    """A collection's embeddings at three precisions: packed sign bits (dim / 8
+    bytes each), int8 with per-dimension scales (dim bytes) and float32. A search
+    shortlists rows by Hamming distance or int8 dot product, then rescores only
+    the shortlist against the memory-mapped float32 vectors."""
+
+    def __init__(
+        self, codes, chunk_ids, vectors, norms, int8, scales, bits, source_dir: str = None
+    ):
+        self.source_dir = source_dir
+        self.codes = codes
+        self.chunk_ids = chunk_ids
+        self.vectors = vectors
+        self.norms = norms
+        self.int8 = int8
+        self.scales = scales
+        self.bits = bits
+
+    @classmethod
+    def build(cls, codes, chunk_ids, vectors: np.ndarray):
+        """Quantize `vectors` (int8 scales fitted to their per-dimension range)."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=0) / 127
+        scales[scales == 0] = 1.0
+        return cls(
+            np.asarray(codes, dtype=str),
+            np.asarray(chunk_ids, dtype=np.int32),
+            vectors,
+            (vectors**2).sum(axis=1),
+            quantize_int8(vectors, scales),
+            scales.astype(np.float32),
+            quantize_binary(vectors),
+        )
+
+    def __len__(self):
+        return len(self.codes)
+
+    def add(self, codes, chunk_ids, vectors: np.ndarray):
+        """New store with rows appended (quantized with the existing scales)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return QuantizedStore(
+            np.concatenate([self.codes, np.asarray(codes, dtype=str)]),
+            np.concatenate([self.chunk_ids, np.asarray(chunk_ids, dtype=np.int32)]),
+            np.concatenate([self.vectors, vectors]),
+            np.concatenate([self.norms, (vectors**2).sum(axis=1)]),
+            np.concatenate([self.int8, quantize_int8(vectors, self.scales)]),
+            self.scales,
+            np.concatenate([self.bits, quantize_binary(vectors)]),
+        )
+
+    def memory(self) -> dict:
+        """Bytes held by each precision tier."""
+        return {
+            "binary": self.bits.nbytes,
+            "int8": self.int8.nbytes + self.scales.nbytes,
+            "float32": self.vectors.nbytes,
+        }
+
+    def first_stage(self, query: np.ndarray, n: int, method: str = "binary"):
+        """Row indices of the `n` best candidates by the quantized distance."""
+        if method == "binary":
+            query_bits = quantize_binary(query)
+            scores = np.empty(len(self), dtype=np.int32)
+            for start in range(0, len(self), BATCH_ROWS):
+                batch = self.bits[start : start + BATCH_ROWS]
+                scores[start : start + len(batch)] = hamming(batch, query_bits)
+        elif method == "int8":
+            ## Negated dot products with the scales folded into the query.
+            scaled_query = -(query * self.scales)
+            scores = np.empty(len(self), dtype=np.float32)
+            for start in range(0, len(self), BATCH_ROWS):
+                batch = self.int8[start : start + BATCH_ROWS]
+                scores[start : start + len(batch)] = batch.astype(np.float32) @ scaled_query
+        else:
+            raise ValueError(f"Unknown first-stage method: {method}")
+        n = min(n, len(self))
+        return np.sort(np.argpartition(scores, n - 1)[:n])
+
+    def rescore(self, query: np.ndarray, rows: np.ndarray, k: int) -> list:
+        """Exact L2 over `rows` as [(arxiv_code, chunk_id, l2_distance)], closest first."""
+        dists = np.linalg.norm(self.vectors[rows] - query, axis=1)
+        top = np.argsort(dists, kind="stable")[:k]
+        return [
+            (str(self.codes[rows[i]]), int(self.chunk_ids[rows[i]]), float(dists[i]))
+            for i in top
+        ]
+
+    def search(
+        self,
+        query,
+        k: int = 10,
+        method: str = "binary",
+        oversample: int = QUANT_OVERSAMPLE,
+    ) -> list:
+        """Approximate k nearest rows: quantized shortlist, float32 rescoring."""
+        if len(self) == 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        rows = self.first_stage(query, k * oversample, method)
+        return self.rescore(query, rows, k)
+
+    def exact_search(self, query, k: int = 10) -> list:
+        """Full-precision scan of every row (the float baseline)."""
+        query = np.asarray(query, dtype=np.float32)
+        dists = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), BATCH_ROWS):
+            batch = self.vectors[start : start + BATCH_ROWS]
+            dists[start : start + len(batch)] = (
+                self.norms[start : start + len(batch)] - 2 * (batch @ query)
+            )
+        n = min(4 * k, len(self))
+        return self.rescore(query, np.sort(np.argpartition(dists, n - 1)[:n]), k)
+
+    def save(self, store_dir: str):
+        """Write the store arrays to a new directory (atomically renamed)."""
+        tmp_dir = store_dir + ".tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        arrays = {
+            "codes": self.codes,
+            "chunk_ids": self.chunk_ids,
+            "vectors": self.vectors,
+            "norms": self.norms,
+            "int8": self.int8,
+            "scales": self.scales,
+            "bits": self.bits,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.asarray(array))
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"size": len(self), "dim": self.vectors.shape[1], **self.memory()}, f)
+        os.replace(tmp_dir, store_dir)
+        return store_dir
+
+    @classmethod
+    def load(cls, store_dir: str):
+        """Memory-map a saved store."""
+        arrays = {
+            name: np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode="r")
+            for name in ["vectors", "int8", "bits"]
+        }
+        for name in ["codes", "chunk_ids", "norms", "scales"]:
+            arrays[name] = np.load(os.path.join(store_dir, f"{name}.npy"))
+        return cls(**arrays, source_dir=store_dir)
+
+
+def fetch_embeddings(collection_name: str, arxiv_codes: list = None, batch_size=5000):
+    """Load a collection's embeddings from the DB as (codes, chunk_ids, float32 matrix)."""
+    codes, chunk_ids, batches, batch = [], [], [], []
+    for arxiv_code, chunk_id, embedding in db.iter_collection_embeddings(
+        collection_name, arxiv_codes
+    ):
+        codes.append(arxiv_code)
+        chunk_ids.append(-1 if chunk_id is None else chunk_id)
+        batch.append(embedding)
+        if len(batch) == batch_size:
+            batches.append(np.asarray(batch, dtype=np.float32))
+            batch = []
+    if batch:
+        batches.append(np.asarray(batch, dtype=np.float32))
+    if not batches:
+        return codes, chunk_ids, None
+    return codes, chunk_ids, np.concatenate(batches)
+
+
+def build_store(collection_name: str, store_dir: str = QUANT_STORE_DIR):
+    """Build the collection's store from scratch and publish it."""
+    codes, chunk_ids, vectors = fetch_embeddings(collection_name)
+    if vectors is None:
+        return None
+    store = QuantizedStore.build(codes, chunk_ids, vectors)
+    return ann.publish_index(store, collection_name, store_dir)
+
+
+def update_store(collection_name: str, store_dir: str = QUANT_STORE_DIR):
+    """Append papers embedded since the last publish and publish the result."""
+    paths = ann.list_indexes(collection_name, store_dir)
+    if len(paths) == 0:
+        return build_store(collection_name, store_dir)
+    store = QuantizedStore.load(paths[0])
+    missing = set(db.get_arxiv_id_embeddings(collection_name)) - set(store.codes.tolist())
+    if len(missing) == 0:
+        return paths[0]
+    codes, chunk_ids, vectors = fetch_embeddings(collection_name, sorted(missing))
+    store = store.add(codes, chunk_ids, vectors)
+    return ann.publish_index(store, collection_name, store_dir)
+
+
+def get_store(collection_name: str, store_dir: str = QUANT_STORE_DIR):
+    """Process-wide store for a collection, reloaded when a newer version is
+    published; None if none has been built."""
+    paths = ann.list_indexes(collection_name, store_dir)
+    if len(paths) == 0:
+        return None
+    path, store = _loaded.get(collection_name, (None, None))
+    if path != paths[0]:
+        with _load_lock:
+            path, store = _loaded.get(collection_name, (None, None))
+            if path != paths[0]:
+                store = QuantizedStore.load(paths[0])
+                _loaded[collection_name] = (paths[0], store)
+    return store
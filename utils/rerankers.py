@@ -0,0 +1,141 @@
+"""Pluggable GPT Maestro rerankers, chosen with RERANKER: an LLM that flags
+relevant abstracts, or a local int8-quantized cross-encoder (needs
+sentence-transformers and torch). Latency and agreement with the LLM:
+    python executors/benchmark_rerankers.py --min_score 0.3 0.5 0.7
+"""
+import numpy as np
+import threading
+import inspect
+import os
+
+from utils.instruct import run_instructor_query
+import utils.prompts as ps
+
+## Reranker used by GPT Maestro ("llm" or "cross_encoder").
+RERANKER = os.getenv("RERANKER", "llm")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+## Cross-encoder relevance (0-1) below which a document is dropped.
+RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE", 0.5))
+
+_rerankers = {}
+_reranker_lock = threading.Lock()
+
+
+class Reranker:
+    """Selects the documents that are relevant to a question."""
+
+    name = None
+
+    def select(self, question: str, documents: list) -> list:
+        raise NotImplementedError
+
+
+class LLMReranker(Reranker):
+    """Asks an LLM to analyze each abstract and flag the relevant ones."""
+
+    name = "llm"
+
+    def rerank(self, question: str, documents: list) -> ps.RerankedDocuments:
+        system_message = "You are an expert system that can identify and select relevant arxiv papers that can be used to answer a user query."
+        rerank_msg = ps.create_rerank_user_prompt(question, documents)
+        return run_instructor_query(system_message, rerank_msg, ps.RerankedDocuments)
+
+    def select(self, question: str, documents: list) -> list:
+        reranked_documents = self.rerank(question, documents)
+        print(reranked_documents)
+        selected = {
+            k for k, v in reranked_documents.documents.items() if v.selected
+        }
+        return [d for d in documents if d.title in selected]
+
+
+class CrossEncoderReranker(Reranker):
+    """Local cross-encoder scoring (question, title + abstract) pairs on CPU,
+    with int8 dynamic quantization and length-bucketed batches. Documents
+    scoring at least `min_score` are kept, best first."""
+
+    name = "cross_encoder"
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        min_score: float = RERANK_MIN_SCORE,
+        batch_size: int = 16,
+        max_length: int = 512,
+        quantize: bool = True,
+    ):
+        self.model_name = model_name
+        self.min_score = min_score
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.quantize = quantize
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    import torch
+
+                    ## Sigmoid outputs, so scores (and min_score) are on a 0-1
+                    ## scale; ms-marco cross-encoders otherwise return logits.
+                    init_params = inspect.signature(CrossEncoder.__init__).parameters
+                    activation = (
+                        "activation_fn"
+                        if "activation_fn" in init_params
+                        else "default_activation_function"
+                    )
+                    model = CrossEncoder(
+                        self.model_name,
+                        max_length=self.max_length,
+                        device="cpu",
+                        **{activation: torch.nn.Sigmoid()},
+                    )
+                    if self.quantize:
+                        model.model = torch.quantization.quantize_dynamic(
+                            model.model, {torch.nn.Linear}, dtype=torch.qint8
+                        )
+                    self._model = model
+        return self._model
+
+    def score(self, question: str, documents: list) -> np.ndarray:
+        """Relevance of each document to the question (0-1)."""
+        texts = [f"{d.title}. {d.abstract}" for d in documents]
+        ## Batches of similar length, so little of each batch is padding.
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        scores = np.empty(len(texts), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start : start + self.batch_size]
+            scores[batch] = self.model.predict(
+                [(question, texts[i]) for i in batch],
+                batch_size=len(batch),
+                show_progress_bar=False,
+            )
+        return scores
+
+    def select(self, question: str, documents: list) -> list:
+        if len(documents) == 0:
+            return []
+        scores = self.score(question, documents)
+        order = np.argsort(-scores, kind="stable")
+        return [documents[i] for i in order if scores[i] >= self.min_score]
+
+
+RERANKERS = {
+    LLMReranker.name: LLMReranker,
+    CrossEncoderReranker.name: CrossEncoderReranker,
+}
+
+
+def get_reranker(name: str = RERANKER) -> Reranker:
+    """Process-wide reranker by name (models are loaded once)."""
+    if name not in _rerankers:
+        if name not in RERANKERS:
+            raise ValueError(f"Unknown reranker: {name}")
+        with _reranker_lock:
+            if name not in _rerankers:
+                _rerankers[name] = RERANKERS[name]()
+    return _rerankers[name]
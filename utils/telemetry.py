@@ -0,0 +1,107 @@
+from collections import defaultdict
+import tempfile
+import threading
+import atexit
+import queue
+import json
+import time
+import os
+
+SPILL_PATH = os.getenv(
+    "TELEMETRY_SPILL_PATH",
+    os.path.join(tempfile.gettempdir(), "llmpedia_telemetry.jsonl"),
+)
+
+
+class TelemetryWriter:
+    """Background writer for log rows. Rows are queued in memory and written
+    in batches every `batch_size` events or `flush_interval` seconds. When the
+    queue is full or a write fails, rows are spilled to a local JSONL file."""
+
+    def __init__(
+        self,
+        write_fn,
+        max_queue: int = 10000,
+        batch_size: int = 50,
+        flush_interval: float = 5.0,
+        spill_path: str = SPILL_PATH,
+    ):
+        self.write_fn = write_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {"queued": 0, "written": 0, "spilled": 0}
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def log(self, table_name: str, row: dict) -> bool:
+        """Queue a row for `table_name` without blocking."""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait((table_name, row))
+            self.stats["queued"] += 1
+        except queue.Full:
+            self._spill([(table_name, row)])
+        return True
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        batch = []
+        last_flush = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                batch.append(self.queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+            elapsed = time.monotonic() - last_flush
+            if len(batch) >= self.batch_size or (batch and elapsed >= self.flush_interval):
+                self._write(batch)
+                batch = []
+                last_flush = time.monotonic()
+        ## Drain on shutdown.
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: list):
+        """Write a batch grouped by table; spill whatever fails."""
+        rows_by_table = defaultdict(list)
+        for table_name, row in batch:
+            rows_by_table[table_name].append(row)
+        for table_name, rows in rows_by_table.items():
+            try:
+                self.write_fn(table_name, rows)
+                self.stats["written"] += len(rows)
+            except Exception as e:
+                print(f"Error writing telemetry to {table_name}: {e}")
+                self._spill([(table_name, row) for row in rows])
+
+    def _spill(self, items: list):
+        try:
+            with open(self.spill_path, "a") as f:
+                for table_name, row in items:
+                    f.write(json.dumps({"table": table_name, "row": row}, default=str))
+                    f.write("\n")
+            self.stats["spilled"] += len(items)
+        except OSError as e:
+            print(f"Dropped {len(items)} telemetry rows: {e}")
+
+    def close(self, timeout: float = 10.0):
+        """Stop the writer and flush pending rows."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
@@ -12,10 +12,8 @@ import utils.db as db
 
 
 def main():
-    arxiv_codes = pu.get_local_arxiv_codes()
-    done_codes = db.get_arxiv_id_list(db.db_params, "arxiv_details")
-    arxiv_codes = list(set(arxiv_codes) - set(done_codes))
-    arxiv_codes = sorted(arxiv_codes)[::-1]
+    local_codes = pu.get_local_arxiv_codes()
+    arxiv_codes = db.get_pending_codes(local_codes, "arxiv_details")
 
     for arxiv_code in tqdm(arxiv_codes):
         arxiv_info = pu.get_arxiv_info(arxiv_code)
@@ -27,10 +27,8 @@ def shorten_list(list_str: str):
 
 
 def main():
-    arxiv_codes = pu.get_local_arxiv_codes()
-    done_codes = db.get_arxiv_id_list(db.db_params, "summary_notes")
-    arxiv_codes = list(set(arxiv_codes) - set(done_codes))
-    arxiv_codes = sorted(arxiv_codes)[::-1]
+    local_codes = pu.get_local_arxiv_codes()
+    arxiv_codes = db.get_pending_codes(local_codes, "summary_notes")
 
     # mlx_model, mlx_tokenizer = get_mlx_model()
 
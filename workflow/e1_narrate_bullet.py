@@ -17,14 +17,14 @@ import utils.db as db
 def main():
     vs.validate_openai_env()
 
-    arxiv_codes = db.get_arxiv_id_list(db.db_params, "summary_notes")
     title_map = db.get_arxiv_title_dict(db.db_params)
-    done_codes = db.get_arxiv_id_list(db.db_params, "bullet_list_summaries")
-    arxiv_codes = list(set(arxiv_codes) - set(done_codes))
-    arxiv_codes = sorted(arxiv_codes)[::-1][:20]
+    arxiv_codes = db.get_pending_codes(
+        "summary_notes", "bullet_list_summaries", limit=20
+    )
+    notes_map = db.get_extended_notes_many(arxiv_codes, expected_tokens=500)
 
     for arxiv_code in tqdm(arxiv_codes):
-        paper_notes = db.get_extended_notes(arxiv_code, expected_tokens=500)
+        paper_notes = notes_map[arxiv_code]
         paper_title = title_map[arxiv_code]
 
         ## Insert copywriter's summary into the database.
@@ -25,13 +25,15 @@ def main():
     vs.validate_openai_env()
 
     ## Get paper list.
-    arxiv_codes = db.get_arxiv_id_list(pu.db_params, "summary_notes")
-    existing_papers = db.get_arxiv_id_list(pu.db_params, "summaries")
-    arxiv_codes = list(set(arxiv_codes) - set(existing_papers))
+    arxiv_codes = db.get_pending_codes(
+        "summary_notes", "summaries", db_params=pu.db_params
+    )
+    notes_map = db.get_extended_notes_many(
+        arxiv_codes, expected_tokens=2000, db_params=pu.db_params
+    )
 
-    arxiv_codes = sorted(arxiv_codes)[::-1]
     for arxiv_code in tqdm(arxiv_codes):
-        new_content = db.get_extended_notes(arxiv_code, expected_tokens=2000)
+        new_content = notes_map[arxiv_code]
 
         ## Try to run LLM process up to 3 times.
         success = False
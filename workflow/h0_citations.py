@@ -23,11 +23,11 @@ OVERRIDE = False
 
 def main():
     """Load summaries and add missing ones."""
-    arxiv_codes = db.get_arxiv_id_list(db.db_params, "summaries")
-    done_codes = db.get_arxiv_id_list(db.db_params, "semantic_details")
-    if not OVERRIDE:
-        arxiv_codes = list(set(arxiv_codes) - set(done_codes))
-    arxiv_codes = sorted(arxiv_codes)[::-1][:100]
+    if OVERRIDE:
+        arxiv_codes = db.get_arxiv_id_list(db.db_params, "summaries")
+        arxiv_codes = sorted(arxiv_codes)[::-1][:100]
+    else:
+        arxiv_codes = db.get_pending_codes("summaries", "semantic_details", limit=100)
 
     items_added = 0
     errors = 0
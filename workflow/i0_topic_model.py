@@ -207,7 +207,11 @@ def main():
     arxiv_codes = db.get_arxiv_id_list(db_params, "summaries")
     title_map = db.get_arxiv_title_dict(db_params)
     title_map = {k: v for k, v in title_map.items() if k in arxiv_codes}
-    df = db.load_arxiv().reset_index()
+    ## Stream details in chunks, keeping only the papers and columns needed.
+    df = pd.concat(
+        chunk_df[chunk_df.index.isin(arxiv_codes)][["title", "summary"]]
+        for chunk_df in db.load_arxiv(chunksize=5000)
+    ).reset_index()
 
     if REFIT:
         # df = load_and_process_data(title_map)
@@ -226,8 +230,7 @@ def main():
         topic_model = BERTopic.load("data/topic_model.pkl")
         reduced_model = pd.read_pickle("data/reduced_model.pkl")
 
-        done_codes = db.get_arxiv_id_list(db_params, "topics")
-        working_codes = list(set(arxiv_codes) - set(done_codes))
+        working_codes = db.get_pending_codes("summaries", "topics", db_params=db_params)
         df = df[df["arxiv_code"].isin(working_codes)]
 
     df.set_index("arxiv_code", inplace=True)
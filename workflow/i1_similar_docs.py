@@ -34,7 +34,6 @@ def main():
     df = db.load_topics()
     df["similar_docs"] = df.index.map(lambda x: find_most_similar_documents(x, df, 10))
     df.reset_index(inplace=True)
-    df['similar_docs'].apply(db.list_to_pg_array)
     db.upload_df_to_db(
         df[["arxiv_code", "similar_docs"]],
         "similar_documents",
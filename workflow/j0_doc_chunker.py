@@ -14,6 +14,7 @@ sys.path.append(os.environ.get("PROJECT_PATH"))
 os.chdir(os.environ.get("PROJECT_PATH"))
 
 import utils.paper_utils as pu
+import utils.bm25 as bm25
 import utils.db as db
 
 data_path = os.path.join(os.environ.get("PROJECT_PATH"), "data", "arxiv_text")
@@ -126,8 +127,9 @@ def main():
 
     ## Child chunks.
     print("Creating child chunks...")
-    child_done = db.get_arxiv_id_list(pu.db_params, "arxiv_chunks")
-    child_codes = list(set(local_codes) - set(child_done))
+    child_codes = db.get_pending_codes(
+        local_codes, "arxiv_chunks", db_params=pu.db_params
+    )
     print(f"Found {len(child_codes)} child papers pending.")
 
     for arxiv_code in tqdm(child_codes):
@@ -150,8 +152,9 @@ def main():
     ## Parent chunks.
     print("Creating parent chunks...")
     parent_table_name = version_name_map[VERSION_NAME]
-    parent_done = db.get_arxiv_id_list(pu.db_params, parent_table_name)
-    parent_codes = list(set(local_codes) - set(parent_done))
+    parent_codes = db.get_pending_codes(
+        local_codes, parent_table_name, db_params=pu.db_params
+    )
     print(f"Found {len(parent_codes)} parent papers pending.")
 
     for arxiv_code in tqdm(parent_codes):
@@ -174,9 +177,12 @@ def main():
 
     ## Mapping of child-to-parent.
     print("Mapping child-to-parent...")
-    ## ToDo: Allow version param here.
-    mapping_done = db.get_arxiv_id_list(pu.db_params, "arxiv_chunk_map")
-    mapping_codes = list(set(local_codes) - set(mapping_done))
+    mapping_codes = db.get_pending_codes(
+        local_codes,
+        "arxiv_chunk_map",
+        extra_filters=f"t.version = '{VERSION_NAME}'",
+        db_params=pu.db_params,
+    )
     print(f"Found {len(mapping_codes)} mapping papers pending.")
 
     mapping_df = parallel_process_mapping(mapping_codes, child_path, parent_path)
@@ -195,6 +201,11 @@ def main():
     #     mapping_df = pd.DataFrame.from_dict(mapping)
     #     db.upload_df_to_db(mapping_df, "arxiv_chunk_map", pu.db_params)
 
+    ## Lexical index (new papers and newly chunked ones).
+    print("Updating BM25 index...")
+    index_path = bm25.update_index()
+    print(f"BM25 index: {index_path}")
+
 
 if __name__ == "__main__":
     main()
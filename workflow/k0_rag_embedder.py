@@ -58,10 +58,14 @@ def main():
             use_jsonb=True,
         )
 
-        arxiv_codes = db.get_arxiv_id_embeddings(COLLECTION_NAME)
         local_codes = os.listdir(chunk_path)
         local_codes = [code.replace(".json", "") for code in local_codes]
-        processing_codes = list(set(local_codes) - set(arxiv_codes))
+        processing_codes = db.get_pending_codes(
+            local_codes,
+            "langchain_pg_embedding",
+            extra_filters=db.collection_filter(COLLECTION_NAME),
+            target_key="t.cmetadata->>'arxiv_code'",
+        )
 
         for arxiv_code in tqdm(processing_codes):
             chunks_fname = os.path.join(chunk_path, f"{arxiv_code}.json")
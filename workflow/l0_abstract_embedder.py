@@ -16,6 +16,8 @@ load_dotenv()
 sys.path.append(os.environ.get("PROJECT_PATH"))
 
 import utils.paper_utils as pu
+import utils.migrations as mg
+import utils.ann_index as ann
 import utils.db as db
 
 MAX_RETRIES = 3
@@ -45,10 +47,13 @@ def main():
         use_jsonb=True,
     )
 
-    arxiv_codes = db.get_arxiv_id_embeddings(collection_name)
-    local_codes = db.get_arxiv_id_list(pu.db_params, "recursive_summaries")
-    processing_codes = list(set(local_codes) - set(arxiv_codes))
-    processing_codes = sorted(processing_codes)[::-1]
+    processing_codes = db.get_pending_codes(
+        "recursive_summaries",
+        "langchain_pg_embedding",
+        extra_filters=db.collection_filter(collection_name),
+        target_key="t.cmetadata->>'arxiv_code'",
+        db_params=pu.db_params,
+    )
 
     for arxiv_code in tqdm(processing_codes):
         summary = db.get_recursive_summary(arxiv_code)
@@ -72,6 +77,10 @@ def main():
                     time.sleep(RETRY_DELAY)
             continue
 
+    ## Fold the new abstracts into the ANN index used by GPT Maestro search.
+    index_path = ann.update_index(collection_name)
+    print(f"ANN index: {index_path}")
+    mg.ensure_vector_index(collection_name)
     print("Process complete.")
 
 
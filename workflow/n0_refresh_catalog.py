@@ -0,0 +1,22 @@
+import sys, os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.append(os.environ.get("PROJECT_PATH"))
+os.chdir(os.environ.get("PROJECT_PATH"))
+
+import utils.catalog as cat
+import utils.db as db
+
+
+def main():
+    """Refresh the pre-joined paper catalog and publish its snapshot for the app."""
+    db.refresh_catalog(db.db_params)
+    snapshot_path = cat.publish_snapshot()
+    print(f"Published catalog snapshot: {snapshot_path}")
+    print("Done!")
+
+
+if __name__ == "__main__":
+    main()